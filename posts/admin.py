@@ -1,14 +1,22 @@
 from django.contrib import admin
 
 from .models import Comment, Group, Post
+from .search import filter_queryset
 
 
 class PostAdmin(admin.ModelAdmin):
-    list_display = ("text", "pub_date", "author")
+    list_display = ("text", "pub_date", "author", "views")
+    readonly_fields = ("views",)
     search_fields = ("text",)
     list_filter = ("pub_date",)
     empty_value_display = "-пусто-"
 
+    def get_search_results(self, request, queryset, search_term):
+        """Поиск по полнотекстовому индексу вместо LIKE."""
+        if not search_term:
+            return queryset, False
+        return filter_queryset(queryset, search_term), False
+
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = ("title", "slug", "description")
@@ -0,0 +1,215 @@
+"""
+JSON API для чтения лент, групп, профилей и постов.
+
+Ответы собираются из values_list() без создания экземпляров моделей и
+без шаблонов. Ленты разбиты курсорной пагинацией (`?after=`/`?before=`),
+а параметр `?fields=` ограничивает набор полей в ответе.
+"""
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.http import urlencode
+from django.views.decorators.http import require_GET
+
+from .caching import conditional_page
+from .models import AuthorStats, Comment, Group, Post
+from .pagination import CursorPaginator
+from .timeline import FEED_CURSOR_FIELDS, feed_queryset
+
+User = get_user_model()
+
+# Поле ответа -> путь в values_list()
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'updated': 'updated',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comments_count': 'comments_count',
+    'views': 'views',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'author': 'author__username',
+    'text': 'text',
+    'created': 'created',
+}
+CURSOR_FIELDS = ('pub_date', 'id')
+
+
+class FieldsError(ValueError):
+    """Запрошены поля, которых нет в ответе."""
+
+
+def api_view(view):
+    """Только GET и ответы об ошибках в JSON вместо HTML-страниц."""
+    @require_GET
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except Http404:
+            return JsonResponse({'detail': 'Не найдено.'}, status=404)
+        except FieldsError as error:
+            return JsonResponse({'detail': str(error)}, status=400)
+    return wrapper
+
+
+def api_login_required(view):
+    """Ответ 401 вместо перенаправления на страницу входа."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'detail': 'Требуется авторизация.'},
+                                status=401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def selected_fields(request, available):
+    """Поля из параметра `?fields=`, по умолчанию все."""
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(available)
+    fields = [field.strip() for field in raw.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in available]
+    if unknown:
+        raise FieldsError(f'Неизвестные поля: {", ".join(unknown)}. '
+                          f'Доступны: {", ".join(available)}.')
+    return fields
+
+
+def serialize_image(name):
+    return default_storage.url(name) if name else None
+
+
+def rows_page(request, queryset, available, fields=None,
+              cursor_fields=CURSOR_FIELDS, descending=True, per_page=None):
+    """
+    Страница ленты в виде словарей и ссылки на соседние страницы.
+
+    Поля ключа курсора выбираются всегда, но в ответ попадают только
+    запрошенные (`fields`, по умолчанию из параметра `?fields=`).
+    """
+    if fields is None:
+        fields = selected_fields(request, available)
+    lookups = list(dict.fromkeys(
+        [*cursor_fields, *(available[field] for field in fields)]))
+    paginator = CursorPaginator(queryset.values(*lookups),
+                                per_page or settings.POSTS_PER_PAGE,
+                                fields=cursor_fields, descending=descending)
+    page = paginator.get_page(after=request.GET.get('after'),
+                              before=request.GET.get('before'))
+    results = []
+    for row in page:
+        item = {field: row[available[field]] for field in fields}
+        if 'image' in item:
+            item['image'] = serialize_image(item['image'])
+        results.append(item)
+
+    def link(name, cursor):
+        if cursor is None:
+            return None
+        params = {key: value for key, value in request.GET.items()
+                  if key not in ('after', 'before')}
+        params[name] = cursor
+        return f'{request.path}?{urlencode(params)}'
+
+    return {
+        'results': results,
+        'next': link('after', page.next_cursor),
+        'previous': link('before', page.previous_cursor),
+    }
+
+
+def single_row(queryset, available, fields):
+    """Одна запись в виде словаря или 404."""
+    lookups = [available[field] for field in fields]
+    row = queryset.values_list(*lookups).first()
+    if row is None:
+        raise Http404
+    item = dict(zip(fields, row))
+    if 'image' in item:
+        item['image'] = serialize_image(item['image'])
+    return item
+
+
+@api_view
+@conditional_page('index')
+def index(request):
+    """Главная лента."""
+    return JsonResponse(rows_page(request, Post.objects.all(), POST_FIELDS))
+
+
+@api_view
+@conditional_page('group:{slug}')
+def group_posts(request, slug):
+    """Лента группы."""
+    group = Group.objects.filter(slug=slug).values(
+        'id', 'title', 'slug', 'description').first()
+    if group is None:
+        raise Http404
+    data = rows_page(request, Post.objects.filter(group_id=group['id']),
+                     POST_FIELDS)
+    return JsonResponse({'group': group, **data})
+
+
+def author_data(username):
+    """Профиль автора со статистикой."""
+    author = get_object_or_404(
+        User.objects.only('id', 'username', 'first_name', 'last_name'),
+        username=username)
+    stats = AuthorStats.for_user(author)
+    return author, {
+        'username': author.username,
+        'full_name': author.get_full_name(),
+        'posts': stats.posts,
+        'followers': stats.followers,
+        'following': stats.following,
+    }
+
+
+@api_view
+@conditional_page('author:{username}')
+def profile(request, username):
+    """Лента автора."""
+    author, data = author_data(username)
+    page = rows_page(request, Post.objects.filter(author=author),
+                     POST_FIELDS)
+    return JsonResponse({'author': data, **page})
+
+
+@api_view
+@conditional_page('post:{post_id}', 'author:{username}')
+def post_view(request, username, post_id):
+    """Пост и страница его комментариев в порядке добавления."""
+    fields = selected_fields(request, POST_FIELDS)
+    post = single_row(
+        Post.objects.filter(pk=post_id, author__username=username),
+        POST_FIELDS, fields)
+    # Параметр fields относится к посту, комментарии выводятся целиком
+    comments = rows_page(request, Comment.objects.filter(post_id=post_id),
+                         COMMENT_FIELDS, fields=list(COMMENT_FIELDS),
+                         cursor_fields=('created', 'id'), descending=False,
+                         per_page=settings.COMMENTS_PER_PAGE)
+    return JsonResponse({
+        'post': post,
+        'comments': comments['results'],
+        'next': comments['next'],
+        'previous': comments['previous'],
+    })
+
+
+@api_view
+@api_login_required
+def follow_index(request):
+    """Лента подписок текущего пользователя."""
+    return JsonResponse(rows_page(
+        request, feed_queryset(request.user, cursor=True), POST_FIELDS,
+        cursor_fields=FEED_CURSOR_FIELDS))
@@ -0,0 +1,130 @@
+"""
+Потоковый архив постов и комментариев автора.
+
+Записи читаются серверным итератором пачками и сразу отдаются клиенту,
+поэтому память не зависит от числа постов. ZIP-архив пишется в поток
+без перемотки (с дескрипторами данных), картинки копируются кусками.
+"""
+import csv
+import json
+import zipfile
+from datetime import datetime
+
+from django.core.files.storage import default_storage
+
+from .bulk import json_default
+from .models import Comment, Post
+
+CHUNK_SIZE = 2000
+FILE_CHUNK_SIZE = 64 * 1024
+FORMATS = ('csv', 'jsonl')
+COLUMNS = ('record', 'id', 'post_id', 'date', 'group', 'text', 'image',
+           'comments_count')
+
+
+class StreamBuffer:
+    """Файловый объект, накапливающий записанное до выдачи клиенту."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+class TextWriter:
+    """Текстовая обёртка над StreamBuffer для csv.writer."""
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+
+    def write(self, text):
+        return self.buffer.write(text.encode())
+
+
+def records(author):
+    """Посты, затем комментарии автора в виде словарей."""
+    posts = Post.objects.filter(author=author).order_by('pk').values_list(
+        'pk', 'pub_date', 'group__slug', 'text', 'image', 'comments_count')
+    for pk, pub_date, group, text, image, comments_count in posts.iterator(
+            chunk_size=CHUNK_SIZE):
+        yield {'record': 'post', 'id': pk, 'post_id': None,
+               'date': pub_date, 'group': group, 'text': text,
+               'image': image or None, 'comments_count': comments_count}
+    comments = Comment.objects.filter(author=author).order_by(
+        'pk').values_list('pk', 'post_id', 'created', 'text')
+    for pk, post_id, created, text in comments.iterator(
+            chunk_size=CHUNK_SIZE):
+        yield {'record': 'comment', 'id': pk, 'post_id': post_id,
+               'date': created, 'group': None, 'text': text, 'image': None,
+               'comments_count': None}
+
+
+def csv_lines(author):
+    """Строки CSV архива в байтах."""
+    buffer = StreamBuffer()
+    writer = csv.DictWriter(
+        TextWriter(buffer), fieldnames=COLUMNS, lineterminator='\n')
+    writer.writeheader()
+    yield buffer.pop()
+    for record in records(author):
+        record['date'] = json_default(record['date'])
+        writer.writerow(record)
+        yield buffer.pop()
+
+
+def jsonl_lines(author):
+    """Строки JSONL архива в байтах."""
+    for record in records(author):
+        line = json.dumps(record, default=json_default, ensure_ascii=False,
+                          separators=(',', ':'))
+        yield (line + '\n').encode()
+
+
+def stream_archive(author, archive_format):
+    """Содержимое архива автора в выбранном формате без сжатия."""
+    if archive_format == 'csv':
+        return csv_lines(author)
+    return jsonl_lines(author)
+
+
+def stream_zip(author, archive_format):
+    """ZIP с архивом записей и картинками постов автора."""
+    buffer = StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        info = zip_info(f'{author.username}.{archive_format}',
+                        zipfile.ZIP_DEFLATED)
+        with archive.open(info, 'w', force_zip64=True) as entry:
+            for chunk in stream_archive(author, archive_format):
+                entry.write(chunk)
+                yield buffer.pop()
+        images = Post.objects.filter(author=author).exclude(
+            image='').exclude(image=None).order_by('pk').values_list(
+            'image', flat=True)
+        for name in images.iterator(chunk_size=CHUNK_SIZE):
+            if not default_storage.exists(name):
+                continue
+            # Картинки уже сжаты, повторное сжатие только тратит CPU
+            info = zip_info(f'images/{name.lstrip("/")}',
+                            zipfile.ZIP_STORED)
+            with default_storage.open(name) as source, \
+                    archive.open(info, 'w', force_zip64=True) as entry:
+                for chunk in iter(lambda: source.read(FILE_CHUNK_SIZE), b''):
+                    entry.write(chunk)
+                    yield buffer.pop()
+    yield buffer.pop()
+
+
+def zip_info(name, compress_type):
+    info = zipfile.ZipInfo(name, datetime.now().timetuple()[:6])
+    info.compress_type = compress_type
+    return info
@@ -0,0 +1,9 @@
+"""Общие расчёты для команд замера производительности."""
+import math
+
+
+def percentile(values, rank):
+    """Перцентиль методом ближайшего ранга."""
+    ordered = sorted(values)
+    index = max(0, math.ceil(rank / 100 * len(ordered)) - 1)
+    return ordered[index]
@@ -0,0 +1,105 @@
+"""
+Пакетная загрузка и выгрузка данных.
+
+Общие помощники команд generate_dataset, export_content и
+import_content: bulk_create по пачкам, ручные даты при вставке и
+описание моделей, переносимых в формате JSONL.
+"""
+import json
+import os
+from contextlib import contextmanager
+from functools import lru_cache
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Модели в порядке зависимостей: имя в файле -> (модель, поля)
+TRANSFER_MODELS = {
+    'users': (User, ('id', 'username', 'password', 'first_name',
+                     'last_name', 'email', 'is_active', 'date_joined')),
+    'groups': (Group, ('id', 'title', 'slug', 'description')),
+    'posts': (Post, ('id', 'text', 'pub_date', 'updated', 'author_id',
+                     'group_id', 'image', 'views')),
+    'comments': (Comment, ('id', 'post_id', 'author_id', 'text',
+                           'created')),
+    'follows': (Follow, ('id', 'user_id', 'author_id')),
+}
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """Временное отключение auto_now_add и auto_now, чтобы задать даты."""
+    saved = [(field, field.auto_now_add, field.auto_now) for field in fields]
+    for field in fields:
+        field.auto_now_add = field.auto_now = False
+    try:
+        yield
+    finally:
+        for field, auto_now_add, auto_now in saved:
+            field.auto_now_add = auto_now_add
+            field.auto_now = auto_now
+
+
+def date_fields(model):
+    """Поля модели, заполняемые датой автоматически."""
+    return [field for field in model._meta.concrete_fields
+            if getattr(field, 'auto_now', False)
+            or getattr(field, 'auto_now_add', False)]
+
+
+def bulk_create(model, objects, batch_size, **kwargs):
+    """bulk_create по пачкам без построения всего списка объектов."""
+    objects = iter(objects)
+    while True:
+        batch = list(islice(objects, batch_size))
+        if not batch:
+            return
+        model.objects.bulk_create(batch, **kwargs)
+
+
+def json_default(value):
+    """Сериализация дат без потери микросекунд."""
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} не сериализуется в JSON')
+
+
+def dump_line(name, values):
+    """Строка JSONL для записи модели `name`."""
+    return json.dumps({'model': name, **values}, default=json_default,
+                      ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+@lru_cache(maxsize=None)
+def fields_by_attname(model):
+    return {field.attname: field for field in model._meta.concrete_fields}
+
+
+def load_object(model, fields, data):
+    """Экземпляр модели из словаря строки JSONL."""
+    by_attname = fields_by_attname(model)
+    return model(**{
+        name: by_attname[name].to_python(data[name])
+        for name in fields if name in data
+    })
+
+
+def read_checkpoint(path):
+    """Состояние прерванной выгрузки или загрузки, None если его нет."""
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def write_checkpoint(path, state):
+    """Атомарная запись состояния, чтобы сбой не оставил битый файл."""
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w') as file:
+        json.dump(state, file)
+    os.replace(temporary, path)
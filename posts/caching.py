@@ -0,0 +1,96 @@
+"""
+Версии кэша для событийной инвалидации.
+
+Версия области (например, `index`) входит в ключ кэшируемого фрагмента.
+Изменение данных области меняет версию, и старые фрагменты перестают
+использоваться без явного удаления. Потеря версии при вытеснении из кэша
+или по истечении CACHE_VERSION_TIMEOUT порождает новую версию, то есть
+лишь сбрасывает кэш области. Срок хранения не даёт запросам к адресам
+несуществующих объектов копить в кэше вечные версии.
+
+Версии служат и валидаторами условных GET-запросов: ETag страницы
+строится из версий её областей, а Last-Modified - из самой поздней из
+них, поэтому ответ 304 не требует запросов к БД и рендеринга шаблона.
+"""
+import hashlib
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.middleware.csrf import get_token
+from django.views.decorators.http import condition
+
+VERSION_KEY = 'posts:version:{}'
+
+
+def get_version(scope):
+    """Текущая версия области кэша."""
+    key = VERSION_KEY.format(scope)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), settings.CACHE_VERSION_TIMEOUT)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(*scopes):
+    """Смена версий областей кэша после изменения данных."""
+    version = time.time_ns()
+    cache.set_many(
+        {VERSION_KEY.format(scope): version for scope in scopes},
+        settings.CACHE_VERSION_TIMEOUT)
+
+
+def get_versions(*scopes):
+    """Текущие версии нескольких областей кэша одним обращением."""
+    keys = [VERSION_KEY.format(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        version = time.time_ns()
+        for key in missing:
+            cache.add(key, version, settings.CACHE_VERSION_TIMEOUT)
+        versions.update(cache.get_many(missing))
+    return [versions.get(key, 0) for key in keys]
+
+
+def versions_digest(*scopes):
+    """Одна строка из версий нескольких областей для ключа фрагмента."""
+    raw = ':'.join(map(str, get_versions(*scopes)))
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def conditional_page(*scopes):
+    """
+    Декоратор условного GET для страницы, зависящей от областей `scopes`.
+
+    Области задаются шаблонами с аргументами маршрута, например
+    `'group:{slug}'`. Страница различается для пользователей, а у
+    авторизованных содержит формы с CSRF-токеном, поэтому в ETag входят
+    id пользователя и секрет CSRF. Анонимным пользователям секрет не
+    выдаётся, чтобы 304 получали и клиенты без cookie.
+    """
+    def versions(request, **kwargs):
+        if not hasattr(request, '_page_versions'):
+            request._page_versions = get_versions(
+                *(scope.format(**kwargs) for scope in scopes))
+        return request._page_versions
+
+    def etag(request, *args, **kwargs):
+        csrf_secret = ''
+        if request.user.is_authenticated:
+            get_token(request)
+            csrf_secret = request.META['CSRF_COOKIE']
+        raw = ':'.join(map(str, [
+            *versions(request, **kwargs),
+            request.user.pk or 0,
+            csrf_secret,
+        ]))
+        return hashlib.md5(raw.encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        return datetime.fromtimestamp(
+            max(versions(request, **kwargs)) / 1e9, timezone.utc)
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
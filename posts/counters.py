@@ -0,0 +1,114 @@
+"""
+Отложенная запись счётчиков просмотров постов.
+
+Просмотры копятся в памяти процесса и записываются в Post.views пачкой
+раз в POST_VIEWS_FLUSH_SECONDS: одним UPDATE с приращениями через F() на
+POST_VIEWS_FLUSH_BATCH постов, вместе с почасовыми корзинами рейтинга
+популярного (posts.trending). Каждый процесс записывает только свои
+приращения, поэтому параллельные сбросы из разных воркеров не теряют и
+не задваивают просмотры. Не записанные к моменту падения процесса
+просмотры теряются - для счётчика это допустимо.
+
+Буфер живёт в памяти воркера, и команда в отдельном процессе его не
+видит, поэтому сброс запускает таймер в самом процессе: первый просмотр
+после сброса взводит его на POST_VIEWS_FLUSH_SECONDS. Так просмотры
+редких постов не ждут следующего запроса, а запись идёт вне обработки
+запросов. При POST_VIEWS_FLUSH_TIMER = False (в тестах, чтобы фоновый
+поток не писал в тестовую базу) сброс выполняет просмотр, после которого
+интервал истёк.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import connections, models, transaction
+from django.db.models import Case, F, Value, When
+
+from yatube.routers import PRIMARY
+
+from . import trending
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_pending = Counter()
+_last_flush = time.monotonic()
+_timer = None
+
+
+def record_view(post_id):
+    """
+    Учёт просмотра поста, при необходимости со сбросом накопленного.
+
+    Возвращает число просмотров поста, не записанных в БД до вызова.
+    """
+    global _last_flush, _timer
+    due = False
+    with _lock:
+        _pending[post_id] += 1
+        pending = _pending[post_id]
+        if settings.POST_VIEWS_FLUSH_TIMER:
+            if _timer is None:
+                _timer = threading.Timer(settings.POST_VIEWS_FLUSH_SECONDS,
+                                         flush_on_timer)
+                _timer.daemon = True
+                _timer.start()
+        else:
+            now = time.monotonic()
+            due = now - _last_flush >= settings.POST_VIEWS_FLUSH_SECONDS
+            if due:
+                _last_flush = now
+    if due:
+        flush_views()
+    return pending
+
+
+def flush_on_timer():
+    global _timer
+    with _lock:
+        _timer = None
+    try:
+        flush_views()
+    finally:
+        # Соединения потока таймера не закрываются обработкой запроса
+        connections.close_all()
+
+
+def flush_views():
+    """Запись накопленных просмотров в БД, возвращает число постов."""
+    with _lock:
+        counts = dict(_pending)
+        _pending.clear()
+    items = sorted(counts.items())
+    batch_size = settings.POST_VIEWS_FLUSH_BATCH
+    for start in range(0, len(items), batch_size):
+        batch = items[start:start + batch_size]
+        try:
+            write_batch(batch)
+        except Exception:
+            logger.exception('Не удалось записать просмотры постов')
+            # Повторная попытка при следующем сбросе
+            with _lock:
+                _pending.update(dict(items[start:]))
+            return start
+    return len(items)
+
+
+def write_batch(batch):
+    increment = Case(
+        *(When(pk=post_id, then=Value(count)) for post_id, count in batch),
+        output_field=models.PositiveIntegerField())
+    # Явная база: запись счётчика не должна закреплять чтение запроса
+    # за основной базой, как обычная запись через роутер
+    with transaction.atomic(using=PRIMARY):
+        Post.objects.using(PRIMARY).filter(
+            pk__in=[post_id for post_id, _ in batch]).update(
+            views=F('views') + increment)
+        trending.add_views(dict(batch))
+
+
+atexit.register(flush_views)
@@ -2,6 +2,7 @@ from django.core.exceptions import ValidationError
 from django.forms import ModelForm, Textarea
 
 from .models import Comment, Post
+from .thumbnails import schedule_thumbnails
 
 
 class PostForm(ModelForm):
@@ -29,6 +30,13 @@ class PostForm(ModelForm):
             raise ValidationError('Слишком короткий пост, нужно больше букв!')
         return data
 
+    def save(self, commit=True):
+        """Сохранение поста с запуском генерации миниатюр изображения."""
+        post = super().save(commit)
+        if commit and post.image and 'image' in self.changed_data:
+            schedule_thumbnails(post.image.name)
+        return post
+
 
 class CommentForm(ModelForm):
     """Форма для создания комментария."""
@@ -0,0 +1,162 @@
+import json
+import re
+import time
+from datetime import datetime
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from posts.benchmarks import percentile
+from posts.models import Follow, Group, Post
+from posts.urls import urlpatterns
+
+User = get_user_model()
+
+QUERIES_PATTERN = re.compile(r'desc="(\d+) queries"')
+PERCENTILES = (50, 95, 99)
+# Только маршруты на чтение: подписки, комментарии и правка постов
+# изменили бы данные замера и упёрлись бы в ограничение частоты
+READ_ONLY_ROUTES = (
+    'index', 'group', 'search', 'trending', 'follow_index',
+    'profile', 'profile_archive', 'post', 'post_comments',
+    'api_index', 'api_group', 'api_follow_index', 'api_profile', 'api_post',
+)
+
+
+class Command(BaseCommand):
+    """Замер задержек и числа запросов к БД для маршрутов чтения."""
+    help = ('Открывает маршруты чтения posts.urls тестовым клиентом и '
+            'сохраняет p50/p95/p99 задержки и число запросов в JSON.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50,
+                            help='Число запросов к каждому маршруту.')
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--cold', action='store_true',
+                            help='Очищать кэш перед каждым запросом.')
+        parser.add_argument('--routes', nargs='*', choices=READ_ONLY_ROUTES,
+                            help='Имена маршрутов, по умолчанию все.')
+        parser.add_argument('--output', default=None,
+                            help='Файл результатов, по умолчанию '
+                                 'benchmark-<время>.json.')
+        parser.add_argument('--compare', default=None,
+                            help='JSON прошлого прогона для сравнения.')
+
+    def handle(self, *args, **options):
+        reader = self.sample_reader()
+        urls = self.build_urls(reader)
+        if options['routes']:
+            urls = {name: url for name, url in urls.items()
+                    if name in options['routes']}
+        client = Client()
+        client.force_login(reader)
+
+        results = {}
+        for name, url in urls.items():
+            results[name] = self.measure(client, url, options)
+            self.report(name, results[name])
+
+        payload = {
+            'started': datetime.now().isoformat(timespec='seconds'),
+            'requests': options['requests'],
+            'cold_cache': options['cold'],
+            'data': {
+                'users': User.objects.count(),
+                'posts': Post.objects.count(),
+                'follows': Follow.objects.count(),
+            },
+            'routes': results,
+        }
+        output = options['output'] or (
+            f'benchmark-{datetime.now():%Y%m%d-%H%M%S}.json')
+        with open(output, 'w') as file:
+            json.dump(payload, file, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'Результаты: {output}'))
+        if options['compare']:
+            self.compare(options['compare'], results)
+
+    def sample_reader(self):
+        """Пользователь с наибольшим числом подписок."""
+        reader = User.objects.annotate(
+            follows=Count('follower')).order_by('-follows').first()
+        if reader is None:
+            raise CommandError('Нет данных, запустите generate_dataset.')
+        return reader
+
+    def build_urls(self, reader):
+        """Адреса маршрутов чтения posts.urls на примерах из базы."""
+        posts = Post.objects.select_related('author').order_by('-pk')
+        post = posts.filter(author=reader).first() or posts.first()
+        group = Group.objects.order_by('pk').first()
+        if post is None or group is None:
+            raise CommandError('Нет данных, запустите generate_dataset.')
+        values = {
+            'username': post.author.username,
+            'post_id': post.pk,
+            'slug': group.slug,
+        }
+        urls = {}
+        for pattern in urlpatterns:
+            if pattern.name not in READ_ONLY_ROUTES:
+                continue
+            kwargs = {key: values[key] for key in pattern.pattern.converters}
+            urls[pattern.name] = reverse(pattern.name, kwargs=kwargs)
+        if 'search' in urls:
+            urls['search'] += '?' + urlencode({'q': post.text.split()[0]})
+        return urls
+
+    def measure(self, client, url, options):
+        """Серия запросов к адресу с замером времени и числа запросов."""
+        for _ in range(options['warmup']):
+            client.get(url)
+        latencies, queries, statuses = [], [], {}
+        for _ in range(options['requests']):
+            if options['cold']:
+                cache.clear()
+            start = time.perf_counter()
+            response = client.get(url)
+            latencies.append((time.perf_counter() - start) * 1000)
+            match = QUERIES_PATTERN.search(
+                response.get('Server-Timing', ''))
+            if match:
+                queries.append(int(match.group(1)))
+            status = str(response.status_code)
+            statuses[status] = statuses.get(status, 0) + 1
+        result = {'url': url, 'status': statuses,
+                  'mean_ms': round(sum(latencies) / len(latencies), 2)}
+        for rank in PERCENTILES:
+            result[f'p{rank}_ms'] = round(percentile(latencies, rank), 2)
+        if queries:
+            result['queries'] = {'min': min(queries), 'max': max(queries),
+                                 'mean': round(sum(queries) / len(queries),
+                                               2)}
+        return result
+
+    def report(self, name, result):
+        queries = result.get('queries', {}).get('max', '-')
+        self.stdout.write(
+            f"{name:<18} p50={result['p50_ms']:>8.2f} "
+            f"p95={result['p95_ms']:>8.2f} p99={result['p99_ms']:>8.2f} мс  "
+            f"запросов={queries}")
+
+    def compare(self, path, results):
+        """Изменение p95 и числа запросов относительно прошлого прогона."""
+        with open(path) as file:
+            previous = json.load(file)['routes']
+        self.stdout.write(f'Сравнение с {path}:')
+        for name, result in results.items():
+            if name not in previous:
+                continue
+            before = previous[name]
+            delta = result['p95_ms'] - before['p95_ms']
+            queries_before = before.get('queries', {}).get('max', '-')
+            queries_after = result.get('queries', {}).get('max', '-')
+            self.stdout.write(
+                f'{name:<18} p95 {before["p95_ms"]:.2f} -> '
+                f'{result["p95_ms"]:.2f} мс ({delta:+.2f}), '
+                f'запросов {queries_before} -> {queries_after}')
@@ -0,0 +1,73 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.bulk import (TRANSFER_MODELS, dump_line, read_checkpoint,
+                        write_checkpoint)
+
+
+class Command(BaseCommand):
+    """Потоковая выгрузка контента в JSONL с точками возобновления."""
+    help = ('Выгружает пользователей, группы, посты, комментарии и подписки '
+            'в файл JSONL, по строке на запись, в порядке первичного ключа.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл выгрузки.')
+        parser.add_argument('--models', nargs='*',
+                            choices=list(TRANSFER_MODELS),
+                            default=list(TRANSFER_MODELS))
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help='Размер пачки чтения и шаг сохранения '
+                                 'точки возобновления.')
+        parser.add_argument('--resume', action='store_true',
+                            help='Продолжить прерванную выгрузку.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        checkpoint_path = f'{path}.checkpoint'
+        names = [name for name in TRANSFER_MODELS if name in options['models']]
+        state = read_checkpoint(checkpoint_path) if options['resume'] else None
+        if options['resume'] and state is None:
+            raise CommandError(f'Нет точки возобновления {checkpoint_path}.')
+
+        if state and state['model'] not in names:
+            raise CommandError(f'Выгрузка прервана на модели '
+                               f'{state["model"]}, не входящей в --models.')
+        if not names:
+            return
+
+        with open(path, 'r+b' if state else 'wb') as file:
+            if state:
+                # Строки после точки возобновления выгружаются заново
+                file.seek(state['offset'])
+                file.truncate()
+                names = names[names.index(state['model']):]
+            else:
+                write_checkpoint(checkpoint_path, {
+                    'model': names[0], 'last_pk': None, 'offset': 0})
+            for name in names:
+                last_pk = (state['last_pk']
+                           if state and state['model'] == name else None)
+                self.export_model(file, name, last_pk, options['chunk_size'],
+                                  checkpoint_path)
+                state = None
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        self.stdout.write(self.style.SUCCESS(f'Выгрузка завершена: {path}'))
+
+    def export_model(self, file, name, last_pk, chunk_size, checkpoint_path):
+        model, fields = TRANSFER_MODELS[name]
+        queryset = model.objects.order_by('pk').values(*fields)
+        if last_pk is not None:
+            queryset = queryset.filter(pk__gt=last_pk)
+        exported = 0
+        for values in queryset.iterator(chunk_size=chunk_size):
+            file.write(dump_line(name, values).encode())
+            exported += 1
+            if exported % chunk_size == 0:
+                file.flush()
+                write_checkpoint(checkpoint_path, {
+                    'model': name, 'last_pk': values['id'],
+                    'offset': file.tell()})
+        file.flush()
+        self.stdout.write(f'{name}: {exported}')
@@ -0,0 +1,175 @@
+import os
+import random
+from datetime import timedelta
+from io import BytesIO
+from itertools import accumulate
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from posts.bulk import bulk_create, explicit_dates
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+WORDS = (
+    'яндекс практикум пост кот собака погода город море горы книга '
+    'фильм музыка код python django база запрос кэш индекс лента '
+    'подписка автор группа комментарий картинка утро вечер'
+).split()
+
+
+class Command(BaseCommand):
+    """Генерация синтетического набора данных для нагрузочных замеров."""
+    help = ('Создаёт пользователей, группы, посты, комментарии и подписки '
+            'пакетными bulk_create и пересчитывает производные данные.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=50000)
+        parser.add_argument('--comments', type=int, default=100000)
+        parser.add_argument('--follows', type=int, default=20,
+                            help='Среднее число подписок пользователя.')
+        parser.add_argument('--images', type=float, default=0.0,
+                            help='Доля постов с картинкой, от 0 до 1.')
+        parser.add_argument('--days', type=int, default=365,
+                            help='Глубина истории постов в днях.')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--prefix', default='bench',
+                            help='Префикс имён пользователей и групп.')
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        prefix = options['prefix']
+
+        with transaction.atomic():
+            users = self.create_users(prefix, options['users'])
+            groups = self.create_groups(prefix, options['groups'])
+            images = self.create_images(options['images'])
+            self.create_posts(users, groups, images, options['posts'],
+                              options['days'], options['images'])
+            posts = list(Post.objects.filter(
+                author__username__startswith=f'{prefix}_').values_list(
+                'pk', 'pub_date'))
+            self.create_comments(users, posts, options['comments'])
+            self.create_follows(users, options['follows'])
+
+        # bulk_create не отправляет сигналы, поэтому производные данные
+        # пересчитываются целиком
+        for command in ('recount_comments', 'recount_author_stats',
+                        'rebuild_timelines', 'rebuild_search_index'):
+            call_command(command, stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS('Набор данных создан.'))
+
+    def text(self, words):
+        return ' '.join(self.random.choice(WORDS) for _ in range(words))
+
+    def create_users(self, prefix, count):
+        password = make_password(None)
+        start = User.objects.filter(
+            username__startswith=f'{prefix}_').count()
+        bulk_create(
+            User,
+            (User(username=f'{prefix}_{start + i}', password=password)
+             for i in range(count)),
+            self.batch_size)
+        self.stdout.write(f'Пользователей: {count}')
+        return list(User.objects.filter(
+            username__startswith=f'{prefix}_').values_list('pk', flat=True))
+
+    def create_groups(self, prefix, count):
+        start = Group.objects.filter(slug__startswith=f'{prefix}-').count()
+        bulk_create(
+            Group,
+            (Group(title=f'Группа {start + i}', slug=f'{prefix}-{start + i}',
+                   description=self.text(12))
+             for i in range(count)),
+            self.batch_size)
+        self.stdout.write(f'Групп: {count}')
+        return list(Group.objects.filter(
+            slug__startswith=f'{prefix}-').values_list('pk', flat=True))
+
+    def create_images(self, share):
+        if not share:
+            return []
+        directory = os.path.join(settings.MEDIA_ROOT, 'posts')
+        os.makedirs(directory, exist_ok=True)
+        names = []
+        for i in range(10):
+            name = f'posts/dataset_{i}.png'
+            color = tuple(self.random.randrange(256) for _ in range(3))
+            buffer = BytesIO()
+            Image.new('RGB', (1280, 720), color).save(buffer, 'png')
+            with open(os.path.join(settings.MEDIA_ROOT, name), 'wb') as file:
+                file.write(buffer.getvalue())
+            names.append(name)
+        return names
+
+    def create_posts(self, users, groups, images, count, days, share):
+        span = timedelta(days=days).total_seconds()
+
+        def build():
+            for _ in range(count):
+                has_image = images and self.random.random() < share
+                yield Post(
+                    author_id=self.random.choice(users),
+                    group_id=(self.random.choice(groups)
+                              if groups and self.random.random() < 0.6
+                              else None),
+                    text=self.text(self.random.randint(10, 80)),
+                    image=self.random.choice(images) if has_image else '',
+                    pub_date=self.now - timedelta(
+                        seconds=self.random.uniform(0, span)),
+                )
+
+        with explicit_dates(Post._meta.get_field('pub_date')):
+            bulk_create(Post, build(), self.batch_size)
+        self.stdout.write(f'Постов: {count}')
+
+    def create_comments(self, users, posts, count):
+        if not posts:
+            return
+
+        def build():
+            for _ in range(count):
+                post_id, pub_date = self.random.choice(posts)
+                age = max((self.now - pub_date).total_seconds(), 1)
+                yield Comment(
+                    post_id=post_id,
+                    author_id=self.random.choice(users),
+                    text=self.text(self.random.randint(3, 30)),
+                    created=pub_date + timedelta(
+                        seconds=self.random.uniform(0, age)),
+                )
+
+        with explicit_dates(Comment._meta.get_field('created')):
+            bulk_create(Comment, build(), self.batch_size)
+        self.stdout.write(f'Комментариев: {count}')
+
+    def create_follows(self, users, average):
+        # Популярность авторов распределена неравномерно
+        weights = list(accumulate(1 / (rank + 1)
+                                  for rank in range(len(users))))
+        pairs = set()
+        for user_id in users:
+            size = min(self.random.randint(0, average * 2), len(users) - 1)
+            for author_id in self.random.choices(users, cum_weights=weights,
+                                                 k=size):
+                if author_id != user_id:
+                    pairs.add((user_id, author_id))
+        bulk_create(
+            Follow,
+            (Follow(user_id=user_id, author_id=author_id)
+             for user_id, author_id in pairs),
+            self.batch_size, ignore_conflicts=True)
+        self.stdout.write(f'Подписок: {len(pairs)}')
@@ -0,0 +1,88 @@
+import json
+import os
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+from posts.bulk import (TRANSFER_MODELS, date_fields, explicit_dates,
+                        load_object, read_checkpoint, write_checkpoint)
+
+
+class Command(BaseCommand):
+    """Потоковая загрузка контента из JSONL с точками возобновления."""
+    help = ('Загружает файл export_content пачками bulk_create с сохранением '
+            'первичных ключей и пересчитывает производные данные.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл выгрузки.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--resume', action='store_true',
+                            help='Продолжить прерванную загрузку.')
+        parser.add_argument('--skip-rebuild', action='store_true',
+                            help='Не пересчитывать счётчики, ленты и '
+                                 'поисковый индекс после загрузки.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        checkpoint_path = f'{path}.import-checkpoint'
+        offset = 0
+        if options['resume']:
+            state = read_checkpoint(checkpoint_path)
+            if state is None:
+                raise CommandError(
+                    f'Нет точки возобновления {checkpoint_path}.')
+            offset = state['offset']
+
+        self.batch_size = options['batch_size']
+        self.checkpoint_path = checkpoint_path
+        self.counts = {}
+        with open(path, 'rb') as file:
+            file.seek(offset)
+            name, batch = None, []
+            for line in iter(file.readline, b''):
+                if not line.strip():
+                    continue
+                data = json.loads(line)
+                if data['model'] not in TRANSFER_MODELS:
+                    raise CommandError(f'Неизвестная модель {data["model"]}.')
+                if batch and (data['model'] != name
+                              or len(batch) >= self.batch_size):
+                    # Пачка сохраняется до чтения текущей строки
+                    self.flush(name, batch, file.tell() - len(line))
+                    batch = []
+                name = data['model']
+                batch.append(data)
+            if batch:
+                self.flush(name, batch, file.tell())
+
+        self.reset_sequences()
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        for name, count in self.counts.items():
+            self.stdout.write(f'{name}: {count}')
+        if not options['skip_rebuild']:
+            # bulk_create не отправляет сигналы
+            for command in ('recount_comments', 'recount_author_stats',
+                            'rebuild_timelines', 'rebuild_search_index'):
+                call_command(command, stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f'Загрузка завершена: {path}'))
+
+    def flush(self, name, batch, offset):
+        """Вставка пачки и запись смещения следующей строки файла."""
+        model, fields = TRANSFER_MODELS[name]
+        objects = [load_object(model, fields, data) for data in batch]
+        with transaction.atomic(), explicit_dates(*date_fields(model)):
+            model.objects.bulk_create(objects, ignore_conflicts=True)
+        write_checkpoint(self.checkpoint_path, {'offset': offset})
+        self.counts[name] = self.counts.get(name, 0) + len(batch)
+
+    def reset_sequences(self):
+        """Сдвиг последовательностей первичных ключей за загруженные id."""
+        models = [model for model, _ in TRANSFER_MODELS.values()]
+        statements = connection.ops.sequence_reset_sql(no_style(), models)
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
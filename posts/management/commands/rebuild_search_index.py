@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts.search import fts_available, rebuild_index
+
+
+class Command(BaseCommand):
+    """Пересборка полнотекстового индекса постов."""
+    help = 'Пересобирает поисковый индекс FTS5 по таблице постов.'
+
+    def handle(self, *args, **options):
+        if not fts_available():
+            self.stdout.write('Полнотекстовый индекс используется только '
+                              'на SQLite, пересборка не требуется.')
+            return
+        indexed = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано постов: {indexed}'))
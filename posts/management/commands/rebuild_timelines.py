@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts.timeline import rebuild_all
+
+
+class Command(BaseCommand):
+    """Пересборка материализованных лент подписок."""
+    help = ('Пересобирает ленты подписок всех пользователей. '
+            'Перед запуском выполните recount_author_stats.')
+
+    def handle(self, *args, **options):
+        entries = rebuild_all()
+        self.stdout.write(self.style.SUCCESS(
+            f'Записей в лентах: {entries}'))
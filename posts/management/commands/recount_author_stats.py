@@ -0,0 +1,62 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from posts.models import AuthorStats, Follow, Post
+
+User = get_user_model()
+
+FIELDS = ('followers', 'following', 'posts')
+
+
+def count_subquery(queryset, field):
+    """Подзапрос с количеством строк queryset для пользователя."""
+    counts = queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+        field).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counts), 0)
+
+
+class Command(BaseCommand):
+    """Сверка материализованной статистики авторов с исходными таблицами."""
+    help = 'Пересчитывает AuthorStats для всех пользователей.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        users = User.objects.annotate(
+            actual_followers=count_subquery(Follow.objects, 'author'),
+            actual_following=count_subquery(Follow.objects, 'user'),
+            actual_posts=count_subquery(Post.objects, 'author'),
+        ).values_list('pk', 'actual_followers', 'actual_following',
+                      'actual_posts').order_by('pk')
+        created = updated = 0
+        batch = []
+        for row in users.iterator(chunk_size=batch_size):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                created, updated = self.sync(batch, created, updated)
+                batch = []
+        if batch:
+            created, updated = self.sync(batch, created, updated)
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано записей: {created}, исправлено: {updated}'))
+
+    def sync(self, rows, created, updated):
+        """Создание недостающих и исправление расходящихся записей."""
+        existing = AuthorStats.objects.in_bulk([row[0] for row in rows])
+        to_create, to_update = [], []
+        for pk, *values in rows:
+            actual = dict(zip(FIELDS, values))
+            stats = existing.get(pk)
+            if stats is None:
+                to_create.append(AuthorStats(user_id=pk, **actual))
+            elif any(getattr(stats, f) != v for f, v in actual.items()):
+                for field, value in actual.items():
+                    setattr(stats, field, value)
+                to_update.append(stats)
+        AuthorStats.objects.bulk_create(to_create)
+        AuthorStats.objects.bulk_update(to_update, FIELDS)
+        return created + len(to_create), updated + len(to_update)
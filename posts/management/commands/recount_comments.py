@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from posts.models import Comment, Post
+
+
+class Command(BaseCommand):
+    """Пересчёт денормализованного счётчика комментариев постов."""
+    help = 'Пересчитывает Post.comments_count по таблице комментариев.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать количество постов с неверным счётчиком.')
+
+    def handle(self, *args, **options):
+        counts = Comment.objects.filter(post=OuterRef('pk')).order_by(
+        ).values('post').annotate(total=Count('pk')).values('total')
+        actual = Coalesce(Subquery(counts), 0)
+        broken = Post.objects.annotate(actual=actual).exclude(
+            comments_count=F('actual'))
+        if options['dry_run']:
+            self.stdout.write(f'Постов с неверным счётчиком: {broken.count()}')
+            return
+        fixed = Post.objects.filter(
+            pk__in=broken.values('pk')).update(comments_count=actual)
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено счётчиков комментариев: {fixed}'))
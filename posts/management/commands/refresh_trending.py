@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts.trending import refresh
+
+
+class Command(BaseCommand):
+    """Обновление рейтинга популярных постов и групп."""
+    help = ('Переносит новые комментарии и посты в почасовые корзины '
+            'активности и пересчитывает рейтинг популярного. '
+            'Запускайте по расписанию, например раз в 5 минут.')
+
+    def handle(self, *args, **options):
+        stats = refresh()
+        self.stdout.write(self.style.SUCCESS(
+            f'Учтено комментариев: {stats["comments"]}, '
+            f'постов: {stats["posts"]}'))
@@ -0,0 +1,159 @@
+import os
+import random
+import sqlite3
+import threading
+import time
+from tempfile import TemporaryDirectory
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from posts.benchmarks import percentile
+from yatube.sqlite import apply_pragmas
+
+# Профиль по умолчанию у Django: журнал отката, новое соединение на запрос
+PROFILES = {
+    'baseline': {
+        'pragmas': {'journal_mode': 'delete', 'synchronous': 'full'},
+        'persistent': False,
+    },
+    'tuned': {
+        'pragmas': settings.SQLITE_PRAGMAS,
+        'persistent': True,
+    },
+}
+
+READ_SQL = (
+    'SELECT p.id, p.text, p.pub_date, u.username FROM posts_post p '
+    'JOIN auth_user u ON u.id = p.author_id '
+    'ORDER BY p.pub_date DESC, p.id DESC LIMIT 10 OFFSET ?')
+WRITE_SQL = (
+    'INSERT INTO posts_comment (post_id, author_id, text, created) '
+    'VALUES (?, ?, ?, ?)')
+
+
+class WorkerStats:
+    """Результаты одного потока нагрузки."""
+
+    def __init__(self):
+        self.reads = []
+        self.writes = []
+        self.locked = 0
+
+
+class Command(BaseCommand):
+    """Нагрузочный тест SQLite смешанным чтением и записью."""
+    help = ('Копирует базу и нагружает копию параллельными потоками '
+            'чтения ленты и добавления комментариев: с настройками SQLite '
+            'по умолчанию и с прагмами SQLITE_PRAGMAS.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=5.0)
+        parser.add_argument('--write-ratio', type=float, default=0.2,
+                            help='Доля операций записи, от 0 до 1.')
+        parser.add_argument('--profiles', nargs='*', choices=list(PROFILES),
+                            default=list(PROFILES))
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Команда предназначена для SQLite.')
+        with TemporaryDirectory() as directory:
+            source = os.path.join(directory, 'source.sqlite3')
+            self.copy_database(source)
+            with sqlite3.connect(source) as db:
+                post_ids = [row[0] for row in db.execute(
+                    'SELECT id FROM posts_post ORDER BY id DESC LIMIT 1000')]
+                user_ids = [row[0] for row in db.execute(
+                    'SELECT id FROM auth_user ORDER BY id LIMIT 1000')]
+            if not post_ids or not user_ids:
+                raise CommandError('Нет данных, запустите generate_dataset.')
+
+            for name in options['profiles']:
+                path = os.path.join(directory, f'{name}.sqlite3')
+                with sqlite3.connect(source) as db, \
+                        sqlite3.connect(path) as target:
+                    db.backup(target)
+                self.report(name, options, self.run(
+                    path, PROFILES[name], options, post_ids, user_ids))
+
+    def copy_database(self, path):
+        """Снимок текущей базы через backup API, без остановки записи."""
+        if connection.in_atomic_block:
+            # Копирование ждало бы завершения собственной транзакции
+            raise CommandError('Команду нельзя запускать в транзакции.')
+        connection.ensure_connection()
+        target = sqlite3.connect(path)
+        try:
+            connection.connection.backup(target)
+        finally:
+            target.close()
+
+    def connect(self, path, profile):
+        db = sqlite3.connect(path, check_same_thread=False)
+        apply_pragmas(db.cursor(), profile['pragmas'])
+        return db
+
+    def run(self, path, profile, options, post_ids, user_ids):
+        # Режим журнала хранится в файле и задаётся до старта потоков
+        self.connect(path, profile).close()
+        deadline = time.perf_counter() + options['seconds']
+        stats = [WorkerStats() for _ in range(options['workers'])]
+        threads = [
+            threading.Thread(target=self.work, args=(
+                path, profile, deadline, options['write_ratio'], post_ids,
+                user_ids, worker_stats))
+            for worker_stats in stats
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return stats
+
+    def work(self, path, profile, deadline, write_ratio, post_ids, user_ids,
+             stats):
+        rng = random.Random()
+        db = None
+        while time.perf_counter() < deadline:
+            if db is None:
+                db = self.connect(path, profile)
+            write = rng.random() < write_ratio
+            start = time.perf_counter()
+            try:
+                if write:
+                    db.execute(WRITE_SQL, (
+                        rng.choice(post_ids), rng.choice(user_ids),
+                        'Комментарий нагрузочного теста',
+                        timezone.now().isoformat()))
+                    db.commit()
+                else:
+                    db.execute(READ_SQL, (rng.randrange(100),)).fetchall()
+            except sqlite3.OperationalError as error:
+                if 'locked' not in str(error):
+                    raise
+                stats.locked += 1
+                db.rollback()
+            else:
+                elapsed = (time.perf_counter() - start) * 1000
+                (stats.writes if write else stats.reads).append(elapsed)
+            if not profile['persistent']:
+                db.close()
+                db = None
+        if db is not None:
+            db.close()
+
+    def report(self, name, options, stats):
+        reads = [value for item in stats for value in item.reads]
+        writes = [value for item in stats for value in item.writes]
+        locked = sum(item.locked for item in stats)
+        seconds = options['seconds']
+        read_p95 = percentile(reads, 95) if reads else 0
+        write_p95 = percentile(writes, 95) if writes else 0
+        self.stdout.write(
+            f'{name:<9} {(len(reads) + len(writes)) / seconds:>9.1f} оп/с  '
+            f'чтение {len(reads) / seconds:>8.1f}/с p95={read_p95:.2f} мс  '
+            f'запись {len(writes) / seconds:>7.1f}/с p95={write_p95:.2f} мс  '
+            f'locked={locked}')
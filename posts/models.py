@@ -1,6 +1,7 @@
 from django.contrib.auth import get_user_model
 from django.db import models
-from django.db.models import UniqueConstraint
+from django.db.models import F, UniqueConstraint
+from django.db.models.functions import Greatest
 
 User = get_user_model()
 
@@ -19,18 +20,29 @@ class Post(models.Model):
     """Модель поста."""
     text = models.TextField()
     pub_date = models.DateTimeField('date published', auto_now_add=True)
+    updated = models.DateTimeField('date updated', auto_now=True)
     author = models.ForeignKey(User, on_delete=models.CASCADE,
                                related_name='posts')
     group = models.ForeignKey(Group, on_delete=models.SET_NULL,
                               related_name='posts',
                               blank=True, null=True)
     image = models.ImageField(upload_to='posts/', blank=True, null=True)
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
+    # Пишется пачками из posts.counters, сигналы модели при этом не вызываются
+    views = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.text
 
     class Meta:
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
+        indexes = [
+            models.Index(fields=['pub_date', 'id'], name='post_date_id_idx'),
+            models.Index(fields=['author', 'pub_date', 'id'],
+                         name='post_author_date_idx'),
+            models.Index(fields=['group', 'pub_date', 'id'],
+                         name='post_group_date_idx'),
+        ]
 
 
 class Comment(models.Model):
@@ -42,6 +54,12 @@ class Comment(models.Model):
     text = models.TextField()
     created = models.DateTimeField('date published', auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', 'created', 'id'],
+                         name='comment_post_created_idx'),
+        ]
+
 
 class Follow(models.Model):
     """Модель подписок."""
@@ -53,3 +71,118 @@ class Follow(models.Model):
     class Meta:
         constraints = [
             UniqueConstraint(fields=['user', 'author'], name='unique_follow')]
+
+
+class TimelineEntry(models.Model):
+    """Модель записи материализованной ленты подписок пользователя."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name='timeline')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name='timeline_entries')
+    author = models.ForeignKey(User, on_delete=models.CASCADE,
+                               related_name='+')
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=['user', 'post'],
+                             name='unique_timeline_entry')]
+        indexes = [
+            models.Index(fields=['user', 'pub_date'],
+                         name='timeline_user_date_idx'),
+            models.Index(fields=['user', 'author'],
+                         name='timeline_user_author_idx'),
+        ]
+
+
+class AuthorStats(models.Model):
+    """Модель материализованной статистики автора."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE,
+                                primary_key=True, related_name='stats')
+    followers = models.PositiveIntegerField(default=0)
+    following = models.PositiveIntegerField(default=0)
+    posts = models.PositiveIntegerField(default=0)
+
+    @classmethod
+    def change(cls, user_id, **deltas):
+        """
+        Атомарное изменение счётчиков пользователя на заданные величины.
+
+        Отсутствующая запись не создаётся: её построит for_user при чтении.
+        """
+        cls.objects.filter(pk=user_id).update(**{
+            field: Greatest(F(field) + delta, 0)
+            for field, delta in deltas.items()
+        })
+
+    @classmethod
+    def rebuild(cls, user):
+        """Пересчёт статистики пользователя по исходным таблицам."""
+        stats, _ = cls.objects.update_or_create(user=user, defaults={
+            'followers': Follow.objects.filter(author=user).count(),
+            'following': Follow.objects.filter(user=user).count(),
+            'posts': Post.objects.filter(author=user).count(),
+        })
+        return stats
+
+    @classmethod
+    def for_user(cls, user):
+        """Статистика пользователя одним запросом по первичному ключу."""
+        return cls.objects.filter(pk=user.pk).first() or cls.rebuild(user)
+
+
+class PostActivity(models.Model):
+    """Модель почасовой активности поста для рейтинга популярного."""
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name='+')
+    hour = models.DateTimeField()
+    comments = models.PositiveIntegerField(default=0)
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=['post', 'hour'],
+                             name='unique_post_activity')]
+        indexes = [
+            models.Index(fields=['hour'], name='post_activity_hour_idx'),
+        ]
+
+
+class GroupActivity(models.Model):
+    """Модель почасового числа новых постов группы."""
+    group = models.ForeignKey(Group, on_delete=models.CASCADE,
+                              related_name='+')
+    hour = models.DateTimeField()
+    posts = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=['group', 'hour'],
+                             name='unique_group_activity')]
+        indexes = [
+            models.Index(fields=['hour'], name='group_activity_hour_idx'),
+        ]
+
+
+class TrendingWatermark(models.Model):
+    """Модель последней учтённой в активности записи таблицы."""
+    name = models.CharField(max_length=20, primary_key=True)
+    last_id = models.BigIntegerField(default=0)
+
+
+class TrendingPost(models.Model):
+    """Модель места поста в рейтинге популярного."""
+    post = models.OneToOneField(Post, on_delete=models.CASCADE,
+                                primary_key=True, related_name='+')
+    rank = models.PositiveIntegerField(unique=True)
+    score = models.FloatField()
+    comments = models.PositiveIntegerField()
+    views = models.PositiveIntegerField()
+
+
+class TrendingGroup(models.Model):
+    """Модель места группы в рейтинге популярного."""
+    group = models.OneToOneField(Group, on_delete=models.CASCADE,
+                                 primary_key=True, related_name='+')
+    rank = models.PositiveIntegerField(unique=True)
+    posts = models.PositiveIntegerField()
@@ -0,0 +1,275 @@
+"""Пагинация лент постов: постраничная и курсорная (keyset)."""
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import Paginator
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .caching import get_version
+
+COUNT_KEY = 'posts:count:{}:{}'
+
+
+def _cursor_default(value):
+    """Сериализация даты без потери микросекунд."""
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} не подходит для курсора')
+
+
+def encode_cursor(values):
+    """Упаковка значений ключа сортировки в непрозрачный токен."""
+    raw = json.dumps(list(values), default=_cursor_default,
+                     separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Распаковка токена курсора, None для испорченного токена."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError, TypeError):
+        return None
+    if not isinstance(values, list):
+        return None
+    try:
+        return [
+            (parse_datetime(value) or value)
+            if isinstance(value, str) else value
+            for value in values
+        ]
+    except ValueError:
+        return None
+
+
+def loaded_queryset(queryset, rows):
+    """
+    QuerySet с уже выбранными строками `rows`.
+
+    Как и у Page стандартного Paginator, object_list курсорной страницы
+    остаётся QuerySet, но при обходе повторного запроса к БД нет.
+    """
+    loaded = queryset.all()
+    loaded._result_cache = list(rows)
+    loaded._prefetch_done = True
+    return loaded
+
+
+class CursorPage:
+    """Страница курсорной пагинации, совместимая с шаблоном paginator.html."""
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, next_cursor=None,
+                 previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<CursorPage after {self.previous_cursor or "start"}>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Пагинатор по ключу сортировки без OFFSET и COUNT(*).
+
+    Каждая страница выбирается диапазонным запросом по ключу `fields`
+    (по умолчанию `(pub_date, id)`), поэтому стоимость запроса не
+    зависит от глубины страницы.
+    """
+
+    def __init__(self, object_list, per_page, fields=('pub_date', 'id'),
+                 descending=True):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.fields = tuple(fields)
+        self.descending = descending
+
+    def _order(self, reverse=False):
+        desc = self.descending != reverse
+        return [f'-{field}' if desc else field for field in self.fields]
+
+    def _key(self, item):
+        if isinstance(item, dict):
+            return [item[field] for field in self.fields]
+        return [getattr(item, field) for field in self.fields]
+
+    def _clean(self, values):
+        """
+        Значения курсора, приведённые к типам полей ключа.
+
+        None для токена чужой формы: его значения попали бы в условия
+        запроса и вызвали бы ошибку, поэтому такой курсор означает
+        первую страницу.
+        """
+        if values is None or len(values) != len(self.fields):
+            return None
+        meta = self.object_list.model._meta
+        annotations = self.object_list.query.annotations
+        cleaned = []
+        for name, value in zip(self.fields, values):
+            try:
+                field = meta.get_field(name)
+            except FieldDoesNotExist:
+                field = annotations[name].output_field
+            if isinstance(field, models.DateTimeField):
+                if not isinstance(value, datetime) or timezone.is_naive(
+                        value):
+                    return None
+            elif isinstance(value, (dict, list)):
+                return None
+            try:
+                cleaned.append(field.to_python(value))
+            except (ValidationError, TypeError, ValueError):
+                return None
+        return cleaned
+
+    def _seek(self, values, forward):
+        """Условие «строго после ключа» в направлении обхода."""
+        lookup = 'lt' if self.descending == forward else 'gt'
+        condition = Q()
+        for position, field in enumerate(self.fields):
+            exact = {
+                name: value
+                for name, value in zip(self.fields[:position],
+                                       values[:position])
+            }
+            exact[f'{field}__{lookup}'] = values[position]
+            condition |= Q(**exact)
+        return condition
+
+    def get_page(self, after=None, before=None):
+        """Страница после курсора `after` или перед курсором `before`."""
+        after_values = self._clean(decode_cursor(after)) if after else None
+        before_values = (self._clean(decode_cursor(before))
+                         if before else None)
+        queryset = self.object_list
+        limit = self.per_page + 1
+
+        if before_values:
+            rows = list(queryset.filter(self._seek(before_values, False))
+                        .order_by(*self._order(reverse=True))[:limit])
+            has_more = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            next_cursor = encode_cursor(
+                self._key(rows[-1]) if rows else before_values)
+            previous_cursor = (encode_cursor(self._key(rows[0]))
+                               if has_more else None)
+            return CursorPage(loaded_queryset(queryset, rows), self,
+                              next_cursor, previous_cursor)
+
+        previous_cursor = None
+        if after_values:
+            queryset = queryset.filter(self._seek(after_values, True))
+            previous_cursor = encode_cursor(after_values)
+        rows = list(queryset.order_by(*self._order())[:limit])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        next_cursor = encode_cursor(self._key(rows[-1])) if has_more else None
+        if previous_cursor and rows:
+            previous_cursor = encode_cursor(self._key(rows[0]))
+        return CursorPage(loaded_queryset(queryset, rows), self,
+                          next_cursor, previous_cursor)
+
+
+def prime_count(paginator, scope):
+    """
+    Число объектов Paginator из кэша области `scope`.
+
+    Ключ включает версию области, поэтому COUNT(*) повторяется только
+    после записи, меняющей область, или по истечении
+    PAGINATOR_COUNT_TIMEOUT. Значение подставляется в cached_property
+    Paginator.count, и тип пагинатора остаётся прежним.
+    """
+    key = COUNT_KEY.format(scope, get_version(scope))
+    count = cache.get(key)
+    if count is None:
+        cache.set(key, paginator.count, settings.PAGINATOR_COUNT_TIMEOUT)
+    else:
+        paginator.__dict__['count'] = count
+    return paginator
+
+
+def page_window(page, on_each_side=3, on_ends=2):
+    """
+    Номера страниц вокруг текущей и на краях, None на месте пропуска.
+
+    Для 200 000 страниц шаблон выводит десяток ссылок вместо всего
+    page_range.
+    """
+    number = page.number
+    num_pages = page.paginator.num_pages
+    if num_pages <= (on_each_side + on_ends) * 2:
+        return list(page.paginator.page_range)
+    window = []
+    if number > on_each_side + on_ends + 1:
+        window.extend(range(1, on_ends + 1))
+        window.append(None)
+        window.extend(range(number - on_each_side, number + 1))
+    else:
+        window.extend(range(1, number + 1))
+    if number < num_pages - on_each_side - on_ends:
+        window.extend(range(number + 1, number + on_each_side + 1))
+        window.append(None)
+        window.extend(range(num_pages - on_ends + 1, num_pages + 1))
+    else:
+        window.extend(range(number + 1, num_pages + 1))
+    return window
+
+
+def is_cursor_mode(request):
+    """Курсорная ли пагинация у запроса ленты."""
+    return bool(settings.POSTS_CURSOR_PAGINATION
+                or request.GET.get('after') or request.GET.get('before'))
+
+
+def paginate(request, object_list, per_page=None, count_scope=None,
+             cursor_fields=('pub_date', 'id')):
+    """
+    Пагинация ленты постов для представления.
+
+    Курсорный режим включается настройкой POSTS_CURSOR_PAGINATION или
+    наличием параметров `?after=`/`?before=` в запросе, иначе используется
+    обычный постраничный Paginator. Число постов постраничного режима
+    кэшируется в области `count_scope`, если она задана. Курсор строится
+    по полям или аннотациям `cursor_fields`, задающим порядок ленты.
+    """
+    per_page = per_page or settings.POSTS_PER_PAGE
+    after = request.GET.get('after')
+    before = request.GET.get('before')
+    if is_cursor_mode(request):
+        paginator = CursorPaginator(object_list, per_page,
+                                    fields=cursor_fields)
+        return paginator, paginator.get_page(after=after, before=before)
+    paginator = Paginator(object_list, per_page)
+    if count_scope:
+        prime_count(paginator, count_scope)
+    return paginator, paginator.get_page(request.GET.get('page'))
@@ -0,0 +1,149 @@
+"""
+Полнотекстовый поиск по постам.
+
+На SQLite используется виртуальная таблица FTS5 `posts_post_fts`
+с rowid, равным id поста. Индекс обновляется сигналами при сохранении
+и удалении поста, пересобирается командой rebuild_search_index.
+На других СУБД поиск сводится к `text__icontains`.
+"""
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Post
+from .pagination import CursorPage, decode_cursor, encode_cursor
+
+FTS_TABLE = 'posts_post_fts'
+SNIPPET_TOKENS = 24
+# Маркеры подсветки не встречаются в тексте и переживают экранирование
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_END = '\x03'
+
+
+def fts_available():
+    """Доступен ли полнотекстовый индекс на текущей СУБД."""
+    return connection.vendor == 'sqlite'
+
+
+def match_expression(query):
+    """Запрос FTS5: все слова строки, последнее слово по префиксу."""
+    words = re.findall(r'\w+', query)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def index_post(post):
+    """Добавление или обновление поста в поисковом индексе."""
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk])
+        cursor.execute(f'INSERT INTO {FTS_TABLE}(rowid, text) VALUES (%s, %s)',
+                       [post.pk, post.text])
+
+
+def unindex_post(post_id):
+    """Удаление поста из поискового индекса."""
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id])
+
+
+def rebuild_index():
+    """Полная пересборка поискового индекса по таблице постов."""
+    if not fts_available():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE}(rowid, text) '
+            f'SELECT id, text FROM {Post._meta.db_table}')
+        return cursor.rowcount
+
+
+def filter_queryset(queryset, query):
+    """Ограничение queryset постами, найденными по запросу."""
+    match = match_expression(query)
+    if match is None:
+        return queryset.none()
+    if not fts_available():
+        return queryset.filter(text__icontains=query)
+    return queryset.filter(pk__in=RawSQL(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+        [match]))
+
+
+def highlight(snippet):
+    """Экранирование фрагмента текста с подсветкой найденных слов."""
+    return mark_safe(escape(snippet).replace(HIGHLIGHT_START, '<mark>')
+                     .replace(HIGHLIGHT_END, '</mark>'))
+
+
+def clean_cursor(values):
+    """Курсор поиска (оценка bm25, rowid), None для токена другой формы."""
+    if values is None or len(values) != 2:
+        return None
+    score, rowid = values
+    if isinstance(score, (bool, dict, list)) or isinstance(
+            rowid, (bool, dict, list)):
+        return None
+    try:
+        return [float(score), int(rowid)]
+    except (TypeError, ValueError):
+        return None
+
+
+def search_posts(query, per_page, after=None):
+    """
+    Страница найденных постов в порядке релевантности (bm25).
+
+    Пагинация курсорная по ключу (ранг, id), у каждого поста заполняется
+    атрибут `snippet` с подсвеченным фрагментом текста.
+    """
+    match = match_expression(query)
+    if match is None:
+        return CursorPage([], None)
+    if not fts_available():
+        posts = list(Post.objects.select_related('author', 'group').filter(
+            text__icontains=query)[:per_page])
+        for post in posts:
+            post.snippet = escape(post.text)
+        return CursorPage(posts, None)
+
+    sql = (
+        f'SELECT rowid, bm25({FTS_TABLE}), '
+        f'snippet({FTS_TABLE}, 0, %s, %s, %s, %s) '
+        f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s'
+    )
+    params = [HIGHLIGHT_START, HIGHLIGHT_END, '…', SNIPPET_TOKENS, match]
+    cursor_values = clean_cursor(decode_cursor(after)) if after else None
+    if cursor_values:
+        sql += (f' AND (bm25({FTS_TABLE}) > %s OR '
+                f'(bm25({FTS_TABLE}) = %s AND rowid > %s))')
+        params += [cursor_values[0], cursor_values[0], cursor_values[1]]
+    sql += f' ORDER BY bm25({FTS_TABLE}), rowid LIMIT %s'
+    params.append(per_page + 1)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    posts = Post.objects.select_related('author', 'group').in_bulk(
+        [row[0] for row in rows])
+    results = []
+    for post_id, _, snippet in rows:
+        post = posts.get(post_id)
+        if post is not None:
+            post.snippet = highlight(snippet)
+            results.append(post)
+    next_cursor = (encode_cursor([rows[-1][1], rows[-1][0]])
+                   if has_more else None)
+    return CursorPage(results, None, next_cursor)
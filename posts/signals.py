@@ -0,0 +1,200 @@
+"""Обработчики сигналов, поддерживающие денормализованные данные постов."""
+import threading
+
+from django.db.models import F
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import search, timeline
+from .caching import bump_version
+from .models import AuthorStats, Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# id постов, удаляемых в текущем потоке: их комментарии удаляются каскадом
+_deleting = threading.local()
+
+
+def deleting_posts():
+    if not hasattr(_deleting, 'posts'):
+        _deleting.posts = set()
+    return _deleting.posts
+
+
+def page_scopes(post_id, username, *slugs):
+    """Области кэша страниц, на которых показан пост."""
+    scopes = ['index', f'post:{post_id}', f'author:{username}']
+    scopes.extend(f'group:{slug}' for slug in set(slugs) if slug)
+    return scopes
+
+
+def bump_post_pages(post_id):
+    """Смена версий страниц поста, известного только по id."""
+    row = Post.objects.filter(pk=post_id).values_list(
+        'author__username', 'group__slug').first()
+    if row is None:
+        bump_version('index', f'post:{post_id}')
+    else:
+        bump_version(*page_scopes(post_id, *row))
+
+
+@receiver(post_save, sender=Comment)
+def increment_comments_count(sender, instance, created, **kwargs):
+    """Увеличение счётчика комментариев поста при добавлении комментария."""
+    if created:
+        Post.objects.filter(pk=instance.post_id).update(
+            comments_count=F('comments_count') + 1)
+        bump_post_pages(instance.post_id)
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_comments_count(sender, instance, **kwargs):
+    """Уменьшение счётчика комментариев поста при удалении комментария."""
+    if instance.post_id in deleting_posts():
+        # Строка поста удаляется следом, счётчик и версии уже не нужны
+        return
+    Post.objects.filter(pk=instance.post_id, comments_count__gt=0).update(
+        comments_count=F('comments_count') - 1)
+    bump_post_pages(instance.post_id)
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous_group(sender, instance, **kwargs):
+    """Запоминание прежней группы поста, чтобы сбросить и её страницу."""
+    instance._previous_group_slug = None
+    if instance.pk is not None:
+        instance._previous_group_slug = Post.objects.filter(
+            pk=instance.pk).values_list('group__slug', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def increment_posts_stats(sender, instance, created, **kwargs):
+    """Учёт нового или изменённого поста в статистике, кэше и поиске."""
+    scopes = page_scopes(
+        instance.pk, instance.author.username,
+        instance.group.slug if instance.group_id else None,
+        getattr(instance, '_previous_group_slug', None))
+    if created:
+        # Состав страниц главной меняется только с новым или удалённым постом
+        scopes.append('index:list')
+    bump_version(*scopes)
+    search.index_post(instance)
+    if created:
+        AuthorStats.change(instance.author_id, posts=1)
+        timeline.fan_out_post(instance)
+
+
+@receiver(pre_delete, sender=Post)
+def mark_deleting_post(sender, instance, **kwargs):
+    """Отметка поста, комментарии которого удалятся каскадом."""
+    deleting_posts().add(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def decrement_posts_stats(sender, instance, **kwargs):
+    """Учёт удалённого поста в статистике автора, кэше и поиске."""
+    deleting_posts().discard(instance.pk)
+    AuthorStats.change(instance.author_id, posts=-1)
+    bump_version('index:list', *page_scopes(
+        instance.pk, instance.author.username,
+        instance.group.slug if instance.group_id else None))
+    timeline.bump_author_feeds(instance.author_id)
+    search.unindex_post(instance.pk)
+
+
+@receiver(post_save, sender=Follow)
+def increment_follow_stats(sender, instance, created, **kwargs):
+    """Учёт новой подписки в статистике автора и подписчика."""
+    if created:
+        AuthorStats.change(instance.author_id, followers=1)
+        AuthorStats.change(instance.user_id, following=1)
+        timeline.backfill(instance)
+        bump_follow_pages(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def decrement_follow_stats(sender, instance, **kwargs):
+    """Учёт отписки в статистике автора и подписчика."""
+    AuthorStats.change(instance.author_id, followers=-1)
+    AuthorStats.change(instance.user_id, following=-1)
+    timeline.prune(instance)
+    timeline.refill_author(instance.author_id)
+    bump_follow_pages(instance)
+
+
+def bump_follow_pages(follow):
+    """Смена версий профилей, на которых видна подписка."""
+    usernames = User.objects.filter(
+        pk__in=(follow.user_id, follow.author_id)).values_list(
+        'username', flat=True)
+    bump_version(*(f'author:{username}' for username in usernames),
+                 f'feed:{follow.user_id}')
+
+
+def group_scopes(group, *slugs):
+    """
+    Области кэша страниц и карточек, показывающих название группы.
+
+    Кроме главной и страниц группы это страницы её постов и профили их
+    авторов. Группы переименовывают редко, поэтому перебор постов группы
+    здесь допустим.
+    """
+    scopes = {'index', f'group-info:{group.pk}'}
+    scopes.update(f'group:{slug}' for slug in slugs if slug)
+    rows = Post.objects.filter(group_id=group.pk).values_list(
+        'pk', 'author__username')
+    for post_id, username in rows.iterator():
+        scopes.update((f'post:{post_id}', f'author:{username}'))
+    return scopes
+
+
+@receiver(pre_save, sender=Group)
+def remember_previous_slug(sender, instance, **kwargs):
+    """Запоминание прежнего адреса группы, чтобы сбросить и его страницу."""
+    instance._previous_slug = None
+    if instance.pk is not None:
+        instance._previous_slug = Group.objects.filter(
+            pk=instance.pk).values_list('slug', flat=True).first()
+
+
+@receiver(post_save, sender=Group)
+def bump_group_pages(sender, instance, **kwargs):
+    """Смена версий страниц, показывающих название группы."""
+    bump_version(*group_scopes(
+        instance, instance.slug, getattr(instance, '_previous_slug', None)))
+
+
+@receiver(pre_delete, sender=Group)
+def remember_group_pages(sender, instance, **kwargs):
+    """Области страниц группы, пока её посты ещё ссылаются на неё."""
+    instance._page_scopes = group_scopes(instance, instance.slug)
+
+
+@receiver(post_delete, sender=Group)
+def bump_deleted_group_pages(sender, instance, **kwargs):
+    bump_version(*getattr(instance, '_page_scopes', ()),
+                 'index', f'group:{instance.slug}')
+
+
+@receiver(pre_save, sender=User)
+def remember_previous_username(sender, instance, update_fields=None,
+                               **kwargs):
+    """Запоминание прежнего имени пользователя для сброса карточек."""
+    instance._previous_username = instance.username
+    # Вход в аккаунт сохраняет только last_login
+    if update_fields is not None and 'username' not in update_fields:
+        return
+    instance._previous_username = None
+    if instance.pk is not None:
+        instance._previous_username = User.objects.filter(
+            pk=instance.pk).values_list('username', flat=True).first()
+
+
+@receiver(post_save, sender=User)
+def bump_user_cards(sender, instance, created, **kwargs):
+    """Смена версии карточек постов после смены имени автора."""
+    previous = getattr(instance, '_previous_username', None)
+    if not created and previous != instance.username:
+        bump_version(f'user-info:{instance.pk}')
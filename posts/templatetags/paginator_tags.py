@@ -0,0 +1,11 @@
+from django import template
+
+from posts.pagination import page_window as build_page_window
+
+register = template.Library()
+
+
+@register.simple_tag
+def page_window(page, on_each_side=3, on_ends=2):
+    """Номера страниц для шаблона paginator.html, None - пропуск."""
+    return build_page_window(page, on_each_side, on_ends)
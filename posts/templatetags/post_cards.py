@@ -0,0 +1,108 @@
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from posts.caching import versions_digest
+from posts.thumbnails import get_thumbnail_data
+
+register = template.Library()
+
+CARD_KEY = 'posts:card:{}:{}:{}:{:d}:{}'
+EDIT_BUTTON_SLOT = '<!--edit-button:{}-->'
+IMAGE_SLOT = '<!--post-image:{}-->'
+# Переменная контекста: слоты карточек заполнит внешний тег post_slots
+DEFER_SLOTS = 'defer_post_slots'
+
+
+def card_html(post, hide_comment_btn=False):
+    """
+    Общая для всех пользователей часть карточки поста из кэша.
+
+    Кэшируется по версии поста и версиям его автора и группы, имя и
+    название которых показаны в карточке. Вместо кнопки редактирования и
+    изображения в ней стоят слоты с id поста.
+    """
+    scopes = [f'user-info:{post.author_id}']
+    if post.group_id:
+        scopes.append(f'group-info:{post.group_id}')
+    key = CARD_KEY.format(post.pk, post.updated.timestamp(),
+                          post.comments_count, bool(hide_comment_btn),
+                          versions_digest(*scopes))
+    html = cache.get(key)
+    if html is None:
+        html = render_to_string('post_card.html', {
+            'post': post,
+            'hide_comment_btn': hide_comment_btn,
+            'edit_button_slot': mark_safe(EDIT_BUTTON_SLOT.format(post.pk)),
+            'image_slot': mark_safe(IMAGE_SLOT.format(post.pk)),
+        })
+        cache.set(key, html, settings.POST_CARD_CACHE_TIMEOUT)
+    return html
+
+
+def fill_slots(html, posts, user):
+    """
+    Подстановка в слоты карточек кнопки редактирования для автора и
+    миниатюры изображения (или заглушки) по готовности.
+    """
+    for post in posts:
+        edit_button = ''
+        if user is not None and user.pk is not None and (
+                user.pk == post.author_id):
+            edit_button = render_to_string('post_edit_button.html',
+                                           {'post': post})
+        image = ''
+        if post.image:
+            image = render_to_string('post_image.html', {
+                'thumbnail': get_thumbnail_data(post),
+            })
+        html = html.replace(EDIT_BUTTON_SLOT.format(post.pk),
+                            edit_button).replace(
+            IMAGE_SLOT.format(post.pk), image)
+    return mark_safe(html)
+
+
+@register.simple_tag(takes_context=True)
+def post_card(context, post, hide_comment_btn=False):
+    """
+    Карточка поста из кэша с заполненными слотами.
+
+    Внутри тега post_slots слоты остаются пустыми, чтобы кэшируемый
+    фрагмент страницы не зависел от пользователя.
+    """
+    html = card_html(post, hide_comment_btn)
+    if context.get(DEFER_SLOTS):
+        return mark_safe(html)
+    return fill_slots(html, [post], context.get('user'))
+
+
+class PostSlotsNode(template.Node):
+    def __init__(self, nodelist, posts):
+        self.nodelist = nodelist
+        self.posts = posts
+
+    def render(self, context):
+        with context.push(**{DEFER_SLOTS: True}):
+            html = self.nodelist.render(context)
+        return fill_slots(html, self.posts.resolve(context),
+                          context.get('user'))
+
+
+@register.tag
+def post_slots(parser, token):
+    """
+    {% post_slots page %}...{% endpost_slots %}
+
+    Заполнение слотов карточек постов `page` после отрисовки содержимого,
+    например кэшируемого блока {% cache %}.
+    """
+    try:
+        _, posts = token.split_contents()
+    except ValueError:
+        raise template.TemplateSyntaxError(
+            'Тег post_slots принимает один аргумент - список постов.')
+    nodelist = parser.parse(('endpost_slots',))
+    parser.delete_first_token()
+    return PostSlotsNode(nodelist, parser.compile_filter(posts))
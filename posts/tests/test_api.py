@@ -0,0 +1,85 @@
+"""Тесты JSON API."""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """Установка переменных для тестирования."""
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='StasBasov')
+        cls.author = User.objects.create_user(username='Author')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        cls.posts = [
+            Post.objects.create(author=cls.author, group=cls.group,
+                                text=f'Пост номер {i:02}')
+            for i in range(15)
+        ]
+        Comment.objects.create(post=cls.posts[0], author=cls.user,
+                               text='Комментарий')
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+        cls.unauthorized_client = Client()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_index_cursor_pages(self):
+        """Проверка обхода ленты по ссылкам курсорной пагинации."""
+        response = self.unauthorized_client.get(reverse('api_index'))
+        data = response.json()
+        self.assertEqual(len(data['results']), 10)
+        self.assertIsNone(data['previous'])
+        self.assertEqual(data['results'][0]['text'], 'Пост номер 14')
+        self.assertEqual(data['results'][0]['author'], 'Author')
+
+        data = self.unauthorized_client.get(data['next']).json()
+        self.assertEqual([post['text'] for post in data['results']],
+                         [f'Пост номер {i:02}' for i in range(4, -1, -1)])
+        self.assertIsNone(data['next'])
+
+    def test_sparse_fields(self):
+        """Проверка выбора полей параметром fields."""
+        url = reverse('api_group', kwargs={'slug': self.group.slug})
+        data = self.unauthorized_client.get(url, {'fields': 'id,text'}).json()
+        self.assertEqual(data['group']['slug'], 'group')
+        self.assertEqual(set(data['results'][0]), {'id', 'text'})
+        self.assertIn('fields=id%2Ctext', data['next'])
+
+        response = self.unauthorized_client.get(url, {'fields': 'password'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_profile_and_post(self):
+        """Проверка профиля автора и поста с комментариями."""
+        data = self.unauthorized_client.get(reverse(
+            'api_profile', kwargs={'username': 'Author'})).json()
+        self.assertEqual(data['author']['posts'], 15)
+        self.assertEqual(data['author']['followers'], 1)
+
+        data = self.unauthorized_client.get(reverse('api_post', kwargs={
+            'username': 'Author', 'post_id': self.posts[0].pk})).json()
+        self.assertEqual(data['post']['comments_count'], 1)
+        self.assertEqual(data['comments'][0]['text'], 'Комментарий')
+
+        response = self.unauthorized_client.get(reverse('api_post', kwargs={
+            'username': 'StasBasov', 'post_id': self.posts[0].pk}))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response['Content-Type'], 'application/json')
+
+    def test_follow_feed(self):
+        """Проверка ленты подписок и запрета для анонимного пользователя."""
+        url = reverse('api_follow_index')
+        self.assertEqual(self.unauthorized_client.get(url).status_code, 401)
+        data = self.authorized_client.get(url).json()
+        self.assertEqual(len(data['results']), 10)
+        self.assertEqual(data['results'][0]['group'], 'group')
@@ -1 +1,178 @@
 """Тесты моделей."""
+import json
+import os
+from io import StringIO
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts import signals
+from posts.models import AuthorStats, Comment, Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class CommentsCountTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """Установка переменных для тестирования."""
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='StasBasov')
+        cls.post = Post.objects.create(author=cls.user,
+                                       text='Пост для комментариев')
+
+    def test_counter_follows_comments(self):
+        """Проверка изменения счётчика при добавлении и удалении."""
+        comment = Comment.objects.create(post=self.post, author=self.user,
+                                         text='Комментарий')
+        Comment.objects.create(post=self.post, author=self.user,
+                               text='Ещё комментарий')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 2)
+        comment.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+    def test_post_delete_skips_counter(self):
+        """Проверка удаления поста без пересчёта счётчика по комментариям."""
+        post = Post.objects.create(author=self.user, text='Удаляемый пост')
+        for _ in range(3):
+            Comment.objects.create(post=post, author=self.user,
+                                   text='Комментарий')
+        with mock.patch.object(signals, 'bump_post_pages') as bump:
+            post.delete()
+        bump.assert_not_called()
+        self.assertFalse(Comment.objects.filter(post_id=post.pk).exists())
+        self.assertEqual(signals.deleting_posts(), set())
+
+    def test_recount_command(self):
+        """Проверка восстановления счётчика командой recount_comments."""
+        Comment.objects.create(post=self.post, author=self.user,
+                               text='Комментарий')
+        Post.objects.filter(pk=self.post.pk).update(comments_count=42)
+        call_command('recount_comments', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+
+class AuthorStatsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """Установка переменных для тестирования."""
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='StasBasov')
+        cls.author = User.objects.create_user(username='Author')
+
+    def test_stats_follow_changes(self):
+        """Проверка инкрементального обновления статистики."""
+        AuthorStats.for_user(self.user)
+        AuthorStats.for_user(self.author)
+        follow = Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(author=self.author, text='Пост автора')
+        stats = AuthorStats.for_user(self.author)
+        self.assertEqual((stats.followers, stats.following, stats.posts),
+                         (1, 0, 1))
+        self.assertEqual(AuthorStats.for_user(self.user).following, 1)
+        follow.delete()
+        post.delete()
+        stats = AuthorStats.for_user(self.author)
+        self.assertEqual((stats.followers, stats.posts), (0, 0))
+
+    def test_recount_command(self):
+        """Проверка сверки статистики командой recount_author_stats."""
+        Post.objects.create(author=self.author, text='Пост автора')
+        AuthorStats.objects.update_or_create(user=self.author,
+                                             defaults={'posts': 7})
+        call_command('recount_author_stats', stdout=StringIO())
+        self.assertEqual(AuthorStats.objects.get(pk=self.author.pk).posts, 1)
+        self.assertTrue(AuthorStats.objects.filter(pk=self.user.pk).exists())
+
+
+class GenerateDatasetTests(TestCase):
+    def test_generate_dataset(self):
+        """Проверка генерации набора данных и производных таблиц."""
+        call_command('generate_dataset', users=20, groups=2, posts=100,
+                     comments=50, follows=3, seed=1, stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 100)
+        post = Post.objects.order_by('-comments_count').first()
+        self.assertEqual(post.comments_count, post.comments.count())
+        self.assertEqual(AuthorStats.objects.count(), 20)
+        self.assertTrue(TimelineEntry.objects.exists())
+
+    def test_benchmark_views(self):
+        """Проверка замера маршрутов чтения без изменения данных."""
+        call_command('generate_dataset', users=10, groups=2, posts=30,
+                     comments=20, follows=2, seed=3, stdout=StringIO())
+        follows = Follow.objects.count()
+        comments = Comment.objects.count()
+        with TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'benchmark.json')
+            call_command('benchmark_views', requests=2, warmup=0,
+                         output=output, stdout=StringIO())
+            with open(output) as file:
+                routes = json.load(file)['routes']
+        self.assertIn('follow_index', routes)
+        self.assertNotIn('profile_follow', routes)
+        self.assertNotIn('add_comment', routes)
+        self.assertNotIn('post_edit', routes)
+        for name, result in routes.items():
+            self.assertEqual(result['status'], {'200': 2}, name)
+        self.assertEqual(Follow.objects.count(), follows)
+        self.assertEqual(Comment.objects.count(), comments)
+
+
+class ContentTransferTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """Установка переменных для тестирования."""
+        super().setUpClass()
+        call_command('generate_dataset', users=10, groups=2, posts=30,
+                     comments=20, follows=2, seed=2, stdout=StringIO())
+        cls.directory = TemporaryDirectory()
+        cls.path = os.path.join(cls.directory.name, 'content.jsonl')
+
+    def test_export_import_round_trip(self):
+        """Проверка выгрузки и загрузки с сохранением ключей и дат."""
+        call_command('export_content', self.path, chunk_size=7,
+                     stdout=StringIO())
+        posts = list(Post.objects.values_list('pk', 'pub_date', 'updated',
+                                              'comments_count'))
+        follows = Follow.objects.count()
+        Post.objects.all().delete()
+        Follow.objects.all().delete()
+
+        call_command('import_content', self.path, batch_size=7,
+                     stdout=StringIO())
+        self.assertEqual(list(Post.objects.values_list(
+            'pk', 'pub_date', 'updated', 'comments_count')), posts)
+        self.assertEqual(Follow.objects.count(), follows)
+        self.assertFalse(os.path.exists(f'{self.path}.import-checkpoint'))
+
+    def test_export_resume(self):
+        """Проверка продолжения выгрузки с точки возобновления."""
+        call_command('export_content', self.path, stdout=StringIO())
+        with open(self.path, 'rb') as file:
+            expected = file.read()
+        lines = expected.splitlines(keepends=True)
+        position = next(i for i, line in enumerate(lines)
+                        if b'"model":"posts"' in line) + 5
+        with open(self.path, 'wb') as file:
+            # Прерванная выгрузка с недописанной строкой в конце
+            file.write(b''.join(lines[:position]) + b'{"model":"po')
+        with open(f'{self.path}.checkpoint', 'w') as file:
+            json.dump({'model': 'posts',
+                       'last_pk': json.loads(lines[position - 1])['id'],
+                       'offset': len(b''.join(lines[:position]))}, file)
+
+        call_command('export_content', self.path, resume=True,
+                     stdout=StringIO())
+        with open(self.path, 'rb') as file:
+            self.assertEqual(file.read(), expected)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+        super().tearDownClass()
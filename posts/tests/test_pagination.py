@@ -0,0 +1,136 @@
+"""Тесты курсорной пагинации."""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Post
+from posts.pagination import (CursorPaginator, decode_cursor, encode_cursor,
+                              page_window)
+
+User = get_user_model()
+
+
+class CursorPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """Установка переменных для тестирования."""
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='StasBasov')
+        cls.posts = [
+            Post.objects.create(author=cls.user, text=f'Пост номер {i:02}')
+            for i in range(25)
+        ]
+        cls.unauthorized_client = Client()
+        cls.index_url = reverse('index')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cursor_round_trip(self):
+        """Проверка упаковки и распаковки курсора."""
+        post = self.posts[0]
+        values = decode_cursor(encode_cursor([post.pub_date, post.pk]))
+        self.assertEqual(values, [post.pub_date, post.pk])
+        self.assertIsNone(decode_cursor('не-курсор'))
+
+    def test_walk_forward_and_back(self):
+        """Проверка обхода ленты вперёд и назад без пропусков."""
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        expected = list(Post.objects.order_by('-pub_date', '-id'))
+        seen, pages = [], []
+        page = paginator.get_page()
+        while True:
+            pages.append(page)
+            seen.extend(page)
+            if not page.has_next():
+                break
+            page = paginator.get_page(after=page.next_cursor)
+        self.assertEqual(seen, expected)
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        self.assertFalse(pages[0].has_previous())
+
+        back = paginator.get_page(before=pages[2].previous_cursor)
+        self.assertEqual(list(back), list(pages[1]))
+
+    def test_malformed_cursor(self):
+        """Проверка первой страницы вместо ошибки для чужого курсора."""
+        first_page = list(CursorPaginator(Post.objects.all(), 10).get_page())
+        tokens = [encode_cursor(values) for values in (
+            ['abc', 1], [1, 2], [{'a': 1}, 2], ['2020-01-01T00:00:00', 1],
+            [self.posts[0].pub_date, 'abc'], [self.posts[0].pub_date])]
+        urls = (self.index_url, reverse('api_index'))
+        for token in tokens:
+            for url in urls:
+                for name in ('after', 'before'):
+                    response = self.unauthorized_client.get(url,
+                                                             {name: token})
+                    self.assertEqual(response.status_code, 200, token)
+            response = self.unauthorized_client.get(self.index_url,
+                                                    {'after': token})
+            self.assertEqual(list(response.context['page']), first_page)
+        response = self.unauthorized_client.get(reverse('search'), {
+            'q': 'пост', 'after': encode_cursor([{'a': 1}, 'x'])})
+        self.assertEqual(response.status_code, 200)
+
+    def test_index_cursor_links(self):
+        """Проверка ссылок курсорной пагинации на главной странице."""
+        page = CursorPaginator(Post.objects.all(), 10).get_page()
+        response = self.unauthorized_client.get(self.index_url,
+                                               {'after': page.next_cursor})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '?after=')
+        self.assertContains(response, '?before=')
+        self.assertEqual(len(response.context['page']), 10)
+
+
+class CountCachingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """Установка переменных для тестирования."""
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='StasBasov')
+        for i in range(15):
+            Post.objects.create(author=cls.user, text=f'Пост номер {i}')
+        cls.unauthorized_client = Client()
+        cls.profile_url = reverse('profile',
+                                  kwargs={'username': cls.user.username})
+
+    def setUp(self):
+        cache.clear()
+
+    def count_queries(self, url):
+        """Число запросов COUNT при открытии страницы."""
+        with CaptureQueriesContext(connection) as context:
+            response = self.unauthorized_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return sum('COUNT(' in query['sql']
+                   for query in context.captured_queries), response
+
+    def test_count_cached_until_write(self):
+        """Проверка кэширования числа постов и сброса при новом посте."""
+        counts, response = self.count_queries(self.profile_url)
+        self.assertEqual(counts, 1)
+        self.assertIs(type(response.context['paginator']), Paginator)
+        counts, response = self.count_queries(self.profile_url)
+        self.assertEqual(counts, 0)
+        self.assertEqual(response.context['paginator'].count, 15)
+
+        Post.objects.create(author=self.user, text='Новый пост')
+        counts, response = self.count_queries(self.profile_url)
+        self.assertEqual(counts, 1)
+        self.assertEqual(response.context['paginator'].count, 16)
+
+    def test_page_window(self):
+        """Проверка окна номеров страниц вокруг текущей."""
+        paginator = Paginator(range(2000), 10)
+        self.assertEqual(page_window(paginator.page(100)),
+                         [1, 2, None, 97, 98, 99, 100, 101, 102, 103, None,
+                          199, 200])
+        self.assertEqual(page_window(paginator.page(2)),
+                         [1, 2, 3, 4, 5, None, 199, 200])
+        self.assertEqual(page_window(Paginator(range(50), 10).page(3)),
+                         [1, 2, 3, 4, 5])
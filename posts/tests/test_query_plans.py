@@ -0,0 +1,117 @@
+"""Тесты планов запросов представлений."""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import AuthorStats, Comment, Follow, Group, Post
+from posts.pagination import CursorPaginator, encode_cursor
+
+User = get_user_model()
+
+
+class QueryPlanTests(TestCase):
+    """
+    Проверка отсутствия полных сканирований и сортировок во временном
+    B-дереве в запросах лент и страницы поста (EXPLAIN QUERY PLAN).
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Установка переменных для тестирования."""
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='StasBasov')
+        cls.author = User.objects.create_user(username='Author')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание группы')
+        Follow.objects.create(user=cls.user, author=cls.author)
+        cls.posts = [
+            Post.objects.create(author=cls.author, group=cls.group,
+                                text=f'Пост номер {i}')
+            for i in range(15)
+        ]
+        Comment.objects.create(post=cls.posts[0], author=cls.user,
+                               text='Комментарий')
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+        cls.unauthorized_client = Client()
+        cls.cursor = CursorPaginator(Post.objects.all(), 10).get_page(
+        ).next_cursor
+
+    def setUp(self):
+        cache.clear()
+
+    def explain(self, sql):
+        """Шаги плана выполнения запроса."""
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assert_indexed_plans(self, client, url, params=None):
+        """Проверка планов всех SELECT-запросов при открытии страницы."""
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url, params)
+        self.assertEqual(response.status_code, 200, url)
+        for query in context.captured_queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT'):
+                continue
+            for step in self.explain(sql):
+                self.assertNotIn('TEMP B-TREE', step, f'{url}: {sql}')
+                if step.startswith('SCAN'):
+                    self.assertIn('INDEX', step, f'{url}: {sql}')
+
+    def test_feed_plans(self):
+        """Проверка планов запросов лент постов."""
+        urls = (
+            reverse('index'),
+            reverse('group', kwargs={'slug': self.group.slug}),
+            reverse('profile', kwargs={'username': self.author.username}),
+        )
+        for url in urls:
+            self.assert_indexed_plans(self.unauthorized_client, url)
+            self.assert_indexed_plans(self.unauthorized_client, url,
+                                      {'page': 2})
+            self.assert_indexed_plans(self.unauthorized_client, url,
+                                      {'after': self.cursor})
+
+    def test_follow_feed_plans(self):
+        """Проверка планов запросов ленты подписок."""
+        url = reverse('follow_index')
+        self.assert_indexed_plans(self.authorized_client, url)
+        self.assert_indexed_plans(self.authorized_client, url, {'page': 2})
+        with override_settings(POSTS_CURSOR_PAGINATION=True):
+            after = self.authorized_client.get(
+                url).context['page'].next_cursor
+        self.assertIsNotNone(after)
+        self.assert_indexed_plans(self.authorized_client, url,
+                                  {'after': after})
+        self.assert_indexed_plans(self.authorized_client,
+                                  reverse('api_follow_index'),
+                                  {'after': after})
+
+    @override_settings(POSTS_FANOUT_MAX_FOLLOWERS=1)
+    def test_follow_feed_large_author_plans(self):
+        """Проверка планов ленты с постами крупного автора."""
+        AuthorStats.rebuild(self.author)
+        url = reverse('follow_index')
+        self.assert_indexed_plans(self.authorized_client, url)
+        self.assert_indexed_plans(self.authorized_client, url, {'page': 2})
+        self.assert_indexed_plans(self.authorized_client, url,
+                                  {'after': self.cursor})
+
+    def test_post_view_plans(self):
+        """Проверка планов запросов страницы поста."""
+        post = self.posts[0]
+        kwargs = {'username': self.author.username, 'post_id': post.pk}
+        self.assert_indexed_plans(self.authorized_client,
+                                  reverse('post', kwargs=kwargs))
+        comment = post.comments.get()
+        after = encode_cursor([comment.created, comment.pk])
+        for order in ('', 'newest'):
+            self.assert_indexed_plans(
+                self.unauthorized_client,
+                reverse('post_comments', kwargs=kwargs),
+                {'order': order, 'after': after})
@@ -0,0 +1,59 @@
+"""Тесты маршрутизации чтения на реплику БД."""
+import os
+import sqlite3
+from tempfile import TemporaryDirectory
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, connections
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(TransactionTestCase):
+    def setUp(self):
+        """Реплика - снимок тестовой базы в отдельном файле SQLite."""
+        cache.clear()
+        self.user = User.objects.create_user(username='StasBasov')
+        Post.objects.create(author=self.user, text='Пост есть на реплике')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.unauthorized_client = Client()
+
+        self.directory = TemporaryDirectory()
+        path = os.path.join(self.directory.name, 'replica.sqlite3')
+        connection.ensure_connection()
+        target = sqlite3.connect(path)
+        connection.connection.backup(target)
+        target.close()
+        connections.databases['replica'] = {
+            'ENGINE': 'django.db.backends.sqlite3', 'NAME': path}
+        connections.ensure_defaults('replica')
+        connections.prepare_test_settings('replica')
+
+    def test_read_from_replica_and_own_writes(self):
+        """Проверка чтения с реплики и своих изменений с основной базы."""
+        # Пост, ещё не дошедший до отстающей реплики
+        Post.objects.create(author=self.user, text='Пост только в основной')
+        response = self.unauthorized_client.get(reverse('index'))
+        self.assertContains(response, 'Пост есть на реплике')
+        self.assertNotContains(response, 'Пост только в основной')
+
+        response = self.authorized_client.post(reverse('new_post'),
+                                               {'text': 'Свой новый пост'})
+        self.assertIn('pin_primary', response.cookies)
+        cache.clear()
+        response = self.authorized_client.get(reverse('index'))
+        self.assertContains(response, 'Свой новый пост')
+        self.assertContains(response, 'Пост только в основной')
+
+    def tearDown(self):
+        connections['replica'].close()
+        del connections.databases['replica']
+        delattr(connections._connections, 'replica')
+        self.directory.cleanup()
@@ -0,0 +1,63 @@
+"""Тесты полнотекстового поиска."""
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from posts.models import Post
+from posts.search import filter_queryset
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """Установка переменных для тестирования."""
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='StasBasov')
+        cls.cat_post = Post.objects.create(
+            author=cls.user, text='Кот <b>сидит</b> на окне и смотрит')
+        cls.dog_post = Post.objects.create(
+            author=cls.user, text='Собака гуляет во дворе')
+        cls.unauthorized_client = Client()
+        cls.search_url = reverse('search')
+
+    def test_search_finds_post(self):
+        """Проверка поиска поста с подсветкой найденного слова."""
+        response = self.unauthorized_client.get(self.search_url,
+                                                {'q': 'кот'})
+        self.assertEqual(list(response.context['page']), [self.cat_post])
+        self.assertContains(response, '<mark>Кот</mark>')
+        self.assertContains(response, '&lt;b&gt;сидит&lt;/b&gt;')
+
+    def test_search_follows_edits_and_deletes(self):
+        """Проверка обновления индекса при изменении и удалении поста."""
+        self.dog_post.text = 'Кошка гуляет во дворе'
+        self.dog_post.save()
+        self.assertEqual(set(filter_queryset(Post.objects, 'кош')),
+                         {self.dog_post})
+        self.assertFalse(filter_queryset(Post.objects, 'собака').exists())
+        self.cat_post.delete()
+        self.assertFalse(filter_queryset(Post.objects, 'окне').exists())
+
+    def test_search_pagination(self):
+        """Проверка курсорной пагинации результатов поиска."""
+        for i in range(12):
+            Post.objects.create(author=self.user, text=f'Пост про окно {i}')
+        response = self.unauthorized_client.get(self.search_url,
+                                                {'q': 'окно'})
+        page = response.context['page']
+        self.assertEqual(len(page), 10)
+        response = self.unauthorized_client.get(
+            self.search_url, {'q': 'окно', 'after': page.next_cursor})
+        self.assertEqual(len(response.context['page']), 2)
+        self.assertFalse(set(page) & set(response.context['page']))
+
+    def test_rebuild_command(self):
+        """Проверка пересборки индекса командой rebuild_search_index."""
+        Post.objects.filter(pk=self.dog_post.pk).update(text='Жираф')
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertTrue(filter_queryset(Post.objects, 'жираф').exists())
@@ -0,0 +1,70 @@
+"""Тесты отдачи медиа-файлов."""
+import os
+from tempfile import NamedTemporaryFile
+
+from django.conf import settings
+from django.test import TestCase, Client, override_settings
+
+
+class ServeTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """Установка переменных для тестирования."""
+        super().setUpClass()
+        os.makedirs(os.path.join(settings.MEDIA_ROOT, 'posts'), exist_ok=True)
+        cls.fp = NamedTemporaryFile(dir=os.path.join(settings.MEDIA_ROOT,
+                                                     'posts'),
+                                    suffix='.txt')
+        cls.fp.write(b'0123456789')
+        cls.fp.flush()
+        cls.url = (f'{settings.MEDIA_URL}posts/'
+                   f'{os.path.basename(cls.fp.name)}')
+        cls.unauthorized_client = Client()
+
+    def test_serve_file(self):
+        """Проверка отдачи файла с валидаторами и кэшированием."""
+        response = self.unauthorized_client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('max-age', response['Cache-Control'])
+
+        response = self.unauthorized_client.get(
+            self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_serve_range(self):
+        """Проверка отдачи диапазона байт."""
+        response = self.unauthorized_client.get(self.url,
+                                                HTTP_RANGE='bytes=2-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(b''.join(response.streaming_content), b'2345')
+
+        response = self.unauthorized_client.get(self.url,
+                                                HTTP_RANGE='bytes=-3')
+        self.assertEqual(b''.join(response.streaming_content), b'789')
+
+        response = self.unauthorized_client.get(self.url,
+                                                HTTP_RANGE='bytes=20-')
+        self.assertEqual(response.status_code, 416)
+
+    def test_path_outside_root(self):
+        """Проверка запрета выхода за пределы каталога медиа."""
+        response = self.unauthorized_client.get(
+            f'{settings.MEDIA_URL}../yatube/settings.py')
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(SENDFILE_BACKEND='nginx')
+    def test_serve_accel_redirect(self):
+        """Проверка передачи файла прокси через X-Accel-Redirect."""
+        response = self.unauthorized_client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'],
+                         self.url.replace(settings.MEDIA_URL,
+                                          settings.SENDFILE_MEDIA_PREFIX))
+        self.assertEqual(response.content, b'')
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.fp.close()
+        super().tearDownClass()
@@ -0,0 +1,32 @@
+"""Тесты настройки соединений SQLite."""
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TransactionTestCase
+
+from posts.models import Post
+
+User = get_user_model()
+
+
+class SqliteTests(TransactionTestCase):
+    def test_connection_pragmas(self):
+        """Проверка прагм нового соединения."""
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -64 * 1024)
+
+    def test_stress_command(self):
+        """Проверка нагрузочного теста на копии базы."""
+        user = User.objects.create_user(username='StasBasov')
+        Post.objects.create(author=user, text='Пост для нагрузки')
+        out = StringIO()
+        call_command('stress_sqlite', workers=2, seconds=0.2, stdout=out)
+        self.assertIn('baseline', out.getvalue())
+        self.assertIn('tuned', out.getvalue())
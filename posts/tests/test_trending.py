@@ -0,0 +1,110 @@
+"""Тесты рейтинга популярного."""
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.utils import timezone
+
+from posts import counters
+from posts.models import (Comment, Group, Post, PostActivity, TrendingGroup,
+                          TrendingPost)
+from posts.trending import hour_of, refresh
+
+User = get_user_model()
+
+
+class TrendingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """Установка переменных для тестирования."""
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='StasBasov')
+        cls.group = Group.objects.create(title='Котики', slug='cats',
+                                         description='Группа о котиках')
+        cls.quiet_group = Group.objects.create(title='Тишина', slug='quiet',
+                                               description='Пустая группа')
+        cls.first_post = Post.objects.create(author=cls.user, group=cls.group,
+                                             text='Первый пост')
+        cls.second_post = Post.objects.create(author=cls.user,
+                                              group=cls.group,
+                                              text='Второй пост')
+        Post.objects.create(author=cls.user, group=cls.quiet_group,
+                            text='Пост в тихой группе')
+        cls.unauthorized_client = Client()
+        cls.trending_url = reverse('trending')
+
+    def setUp(self):
+        cache.clear()
+        # Просмотры из других тестов не должны попасть в рейтинг
+        counters.flush_views()
+        PostActivity.objects.all().delete()
+
+    def comment(self, post, count):
+        for _ in range(count):
+            Comment.objects.create(post=post, author=self.user,
+                                   text='Комментарий')
+
+    def test_incremental_refresh(self):
+        """Проверка рейтинга по новым комментариям после отметки."""
+        self.comment(self.first_post, 1)
+        self.comment(self.second_post, 2)
+        out = StringIO()
+        call_command('refresh_trending', stdout=out)
+        self.assertIn('Учтено комментариев: 3, постов: 3', out.getvalue())
+        self.assertEqual(
+            list(TrendingPost.objects.order_by('rank').values_list(
+                'post', 'comments')),
+            [(self.second_post.pk, 2), (self.first_post.pk, 1)])
+        self.assertEqual(
+            list(TrendingGroup.objects.order_by('rank').values_list(
+                'group', 'posts')),
+            [(self.group.pk, 2), (self.quiet_group.pk, 1)])
+
+        # Повторно учитываются только комментарии после отметки
+        self.comment(self.first_post, 2)
+        self.assertEqual(refresh(), {'comments': 2, 'posts': 0})
+        self.assertEqual(
+            list(TrendingPost.objects.order_by('rank').values_list(
+                'post', 'comments')),
+            [(self.first_post.pk, 3), (self.second_post.pk, 2)])
+
+        # Активность за пределами окна из рейтинга уходит
+        refresh(now=timezone.now() + timedelta(days=2))
+        self.assertFalse(TrendingPost.objects.exists())
+        self.assertFalse(TrendingGroup.objects.exists())
+
+    def test_recent_activity_ranks_higher(self):
+        """Проверка веса корзин по возрасту внутри окна."""
+        now = timezone.now()
+        PostActivity.objects.create(post=self.first_post, comments=3,
+                                    hour=hour_of(now) - timedelta(hours=20))
+        PostActivity.objects.create(post=self.second_post, comments=1,
+                                    hour=hour_of(now))
+        refresh(now=now)
+        self.assertEqual(
+            list(TrendingPost.objects.order_by('rank').values_list(
+                'post', 'comments')),
+            [(self.second_post.pk, 1), (self.first_post.pk, 3)])
+        older = TrendingPost.objects.get(post=self.first_post)
+        self.assertAlmostEqual(older.score, 3 * 10 * 4 / 24)
+
+    def test_trending_page(self):
+        """Проверка страницы популярного с учётом просмотров."""
+        for _ in range(3):
+            counters.record_view(self.second_post.pk)
+        counters.flush_views()
+        refresh()
+        entry = TrendingPost.objects.get()
+        self.assertEqual((entry.post_id, entry.views),
+                         (self.second_post.pk, 3))
+
+        response = self.unauthorized_client.get(self.trending_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([entry.post for entry in response.context['entries']],
+                         [self.second_post])
+        self.assertContains(response, 'За 24 ч комментариев: 0, просмотров: 3')
+        self.assertContains(response, self.group.title)
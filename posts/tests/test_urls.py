@@ -1,8 +1,17 @@
 """Тесты адресов."""
+import itertools
+import time
+from unittest import mock
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase, Client
+from django.core.cache import cache
+from django.template import engines
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 
+from posts.models import Post
+from yatube import middleware, throttling
+
 User = get_user_model()
 
 
@@ -55,6 +64,95 @@ class StaticURLTests(TestCase):
             reverse('profile', kwargs={'username': self.user.username}))
         self.assertEqual(response.status_code, 200)
 
+    def test_server_timing_header(self):
+        """Проверка заголовка Server-Timing со счётчиком запросов к БД."""
+        response = self.unauthorized_client.get(self.index_url)
+        self.assertIn('Server-Timing', response)
+        self.assertRegex(response['Server-Timing'],
+                         r'db;dur=[\d.]+;desc="\d+ queries", tpl;dur=')
+
+    def test_server_timing_nested_templates(self):
+        """Проверка учёта только внешнего шаблона при вложенной отрисовке."""
+        cache.clear()
+        post = Post.objects.create(author=self.user, text='Пост с карточкой')
+        template = engines['django'].from_string(
+            '{% load post_cards %}{% post_card post %}')
+        middleware._instrument_templates()
+        stats = middleware.RequestStats()
+        middleware._local.stats = stats
+        self.addCleanup(setattr, middleware._local, 'stats', None)
+        # Каждый вызов таймера - один такт: внешний шаблон занимает такт,
+        # вложенная отрисовка карточки не должна добавить своих
+        with mock.patch.object(middleware, 'time') as fake_time:
+            fake_time.perf_counter.side_effect = itertools.count().__next__
+            html = template.render({'post': post})
+        self.assertIn('Пост с карточкой', html)
+        self.assertEqual(stats.template_time, 1)
+
+    def test_budget_exceeded_logged(self):
+        """Проверка записи в лог запросов сверх бюджета."""
+        with self.assertNoLogs('yatube.budget', 'WARNING'):
+            self.unauthorized_client.get(self.index_url)
+        with override_settings(REQUEST_BUDGETS={
+                'default': {'queries': 20, 'ms': 500},
+                'index': {'queries': 0, 'ms': 0}}):
+            with self.assertLogs('yatube.budget', 'WARNING') as logs:
+                self.unauthorized_client.get(self.index_url)
+        self.assertIn('Превышен бюджет index (/)', logs.output[0])
+
+    @override_settings(THROTTLE_RATES={
+        'profile_follow': {'user': (2, 60), 'methods': ('GET',)}})
+    def test_throttle_follow(self):
+        """Проверка ответа 429 сверх лимита подписок пользователя."""
+        cache.clear()
+        self.addCleanup(cache.clear)
+        author = User.objects.create_user(username='leo')
+        follow_url = reverse('profile_follow',
+                             kwargs={'username': author.username})
+        for _ in range(2):
+            response = self.authorized_client.get(follow_url)
+            self.assertEqual(response.status_code, 302)
+        response = self.authorized_client.get(follow_url)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+
+        other_client = Client()
+        other_client.force_login(author)
+        response = other_client.get(
+            reverse('profile_follow', kwargs={'username': 'StasBasov'}))
+        self.assertEqual(response.status_code, 302)
+
+        # За 30 секунд корзина восполняет один жетон
+        rates = throttling.get_rates('profile_follow', 'GET')
+        idents = {'user': self.user.pk}
+        self.assertEqual(throttling.take_token(
+            'profile_follow', rates, idents), 30)
+        later = time.time() + 30
+        self.assertEqual(throttling.take_token(
+            'profile_follow', rates, idents, now=later), 0)
+
+    @override_settings(THROTTLE_RATES={'signup': {'ip': (1, 60 * 60)}},
+                       THROTTLE_TRUSTED_PROXIES=['10.0.0.1'])
+    def test_throttle_behind_proxy(self):
+        """Проверка корзин по IP клиента за доверенным прокси."""
+        cache.clear()
+        self.addCleanup(cache.clear)
+        signup_url = reverse('signup')
+
+        def signup(forwarded, remote='10.0.0.1'):
+            return self.unauthorized_client.post(
+                signup_url, REMOTE_ADDR=remote,
+                HTTP_X_FORWARDED_FOR=forwarded).status_code
+
+        self.assertEqual(signup('1.1.1.1'), 200)
+        self.assertEqual(signup('2.2.2.2'), 200)
+        self.assertEqual(signup('1.1.1.1'), 429)
+        # Подставленный клиентом левый адрес не меняет корзину
+        self.assertEqual(signup('3.3.3.3, 2.2.2.2'), 429)
+        # Без доверенного прокси заголовок не учитывается
+        self.assertEqual(signup('4.4.4.4', remote='5.5.5.5'), 200)
+        self.assertEqual(signup('6.6.6.6', remote='5.5.5.5'), 429)
+
     def test_not_exist_page(self):
         """Проверка доступности главной страницы."""
         response_unauthorized = self.unauthorized_client.get('not_exist/')
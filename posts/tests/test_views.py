@@ -1,17 +1,33 @@
 """Тесты представлений."""
-from tempfile import NamedTemporaryFile
+import io
+import os
+import shutil
+import time
+import zipfile
+from datetime import timedelta
+from tempfile import NamedTemporaryFile, mkdtemp
+from unittest import mock
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
-from django.test import TestCase, Client
+from django.db import connection
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 
-from posts.models import Follow, Post, Group
+from posts import counters
+from posts.caching import VERSION_KEY
+from posts.models import Comment, Follow, Post, Group, TimelineEntry
+from posts.pagination import encode_cursor
+from posts.thumbnails import schedule_thumbnails, thumbnail_key
 
 User = get_user_model()
 
+# Загрузки и миниатюры тестов не попадают в media/ проекта
+MEDIA_ROOT = mkdtemp()
 
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
 class ViewTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -36,6 +52,7 @@ class ViewTests(TestCase):
             b'\x47\x49\x46\x38\x39\x61\x01\x00\x01\x00\x00\x00\x00\x21\xf9\x04'
             b'\x01\x0a\x00\x01\x00\x2c\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02'
             b'\x02\x4c\x01\x00\x3b')
+        os.makedirs(os.path.join(settings.MEDIA_ROOT, 'posts'), exist_ok=True)
         cls.fp = NamedTemporaryFile(mode='w+b',
                                     dir=f'{settings.MEDIA_ROOT}/posts/',
                                     suffix='.gif')
@@ -157,6 +174,54 @@ class ViewTests(TestCase):
                                  self.profile_url,
                                  self.post_with_image_url)
 
+    def test_show_prefetched_thumbnail(self):
+        """Проверка вывода готовой миниатюры из кэша."""
+        cache.clear()
+        url = '/media/cache/prefetched.jpg'
+        cache.set(thumbnail_key(self.post_with_image.image.name, 'card'),
+                  {'url': url, 'width': 960, 'height': 339})
+        for page_url in (self.index_url, self.group_url, self.profile_url):
+            response = self.unauthorized_client.get(page_url)
+            self.assertContains(response, url, msg_prefix=page_url)
+
+    def run_on_commit(self, start):
+        """Выполнение колбэков on_commit, добавленных с позиции `start`."""
+        callbacks = connection.run_on_commit[start:]
+        del connection.run_on_commit[start:]
+        for _, callback in callbacks:
+            callback()
+
+    def test_thumbnails_scheduled_on_commit(self):
+        """Проверка постановки генерации миниатюр после фиксации."""
+        cache.clear()
+        start = len(connection.run_on_commit)
+        name = self.post_with_image.image.name
+        schedule_thumbnails(name)
+        schedule_thumbnails(name)
+        self.assertEqual(len(connection.run_on_commit), start + 1)
+        self.assertIsNone(cache.get(thumbnail_key(name, 'card')))
+        self.run_on_commit(start)
+        self.assertIsNotNone(cache.get(thumbnail_key(name, 'card')))
+
+    def test_thumbnail_replaces_placeholder(self):
+        """Проверка замены заглушки миниатюрой в кэшированных страницах."""
+        cache.clear()
+        placeholder = 'Изображение обрабатывается'
+        start = len(connection.run_on_commit)
+        responses = {url: self.unauthorized_client.get(url)
+                     for url in (self.index_url, self.post_with_image_url)}
+        for url, response in responses.items():
+            self.assertContains(response, placeholder, msg_prefix=url)
+        self.run_on_commit(start)
+        thumbnail = cache.get(
+            thumbnail_key(self.post_with_image.image.name, 'card'))
+        for url, response in responses.items():
+            response = self.unauthorized_client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(response.status_code, 200, url)
+            self.assertNotContains(response, placeholder, msg_prefix=url)
+            self.assertContains(response, thumbnail['url'], msg_prefix=url)
+
     def test_upload_not_image(self):
         """
         Проверка невозможности создания поста.
@@ -174,14 +239,237 @@ class ViewTests(TestCase):
     def test_cache(self):
         """Проверка работы кэша."""
         text = 'Это пост для проверки кэша'
-        self.authorized_client.post(self.new_post_url, {'text': text},
-                                    follow=True)
+        self.authorized_client.get(self.index_url)
+        # Изменение в обход модели не сбрасывает версию кэша
+        Post.objects.filter(pk=self.post.pk).update(text=text)
         response_from_cache = self.authorized_client.get(self.index_url)
         self.assertNotContains(response_from_cache, text)
         cache.clear()
         response = self.authorized_client.get(self.index_url)
         self.assertContains(response, text)
 
+    def test_cache_invalidation(self):
+        """Проверка сброса кэша главной страницы при новом посте."""
+        text = 'Это пост для проверки сброса кэша'
+        self.authorized_client.get(self.index_url)
+        self.authorized_client.post(self.new_post_url, {'text': text},
+                                    follow=True)
+        response = self.authorized_client.get(self.index_url)
+        self.assertContains(response, text)
+
+    def test_cache_versions_by_scope(self):
+        """Проверка сброса кэша только страниц главной с изменённым постом."""
+        for i in range(10):
+            Post.objects.create(author=self.user, text=f'Пост номер {i}')
+
+        def versions():
+            return [
+                self.unauthorized_client.get(
+                    self.index_url, {'page': page}).context['index_version']
+                for page in (1, 2)
+            ]
+
+        first_page, second_page = versions()
+        newest = Post.objects.order_by('-pub_date', '-id').first()
+        newest.text = 'Исправленный текст'
+        newest.save()
+        edited_first_page, edited_second_page = versions()
+        self.assertNotEqual(edited_first_page, first_page)
+        self.assertEqual(edited_second_page, second_page)
+
+        Post.objects.create(author=self.user, text='Новый пост')
+        self.assertNotEqual(versions()[1], second_page)
+
+    def test_conditional_get(self):
+        """Проверка ответа 304 для неизменившейся страницы поста."""
+        etag = self.authorized_client.get(self.post_url)['ETag']
+        response = self.authorized_client.get(self.post_url,
+                                              HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        other = self.one_more_authorized_client.get(self.post_url,
+                                                    HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(other.status_code, 200)
+
+        self.one_more_authorized_client.post(self.add_comment_url,
+                                             {'text': 'Новый комментарий'})
+        response = self.authorized_client.get(self.post_url,
+                                              HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_missing_page_version_expires(self):
+        """Проверка срока хранения версии адреса несуществующего автора."""
+        response = self.unauthorized_client.get(
+            reverse('profile', kwargs={'username': 'nobody'}))
+        self.assertEqual(response.status_code, 404)
+        key = VERSION_KEY.format('author:nobody')
+        self.assertIsNotNone(cache.get(key))
+        later = time.time() + settings.CACHE_VERSION_TIMEOUT + 1
+        with mock.patch('time.time', return_value=later):
+            self.assertIsNone(cache.get(key))
+
+    def test_conditional_get_group_change(self):
+        """Проверка смены ETag прежней группы при переносе поста."""
+        etag = self.unauthorized_client.get(self.group_url)['ETag']
+        response = self.unauthorized_client.get(self.group_url,
+                                                HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.authorized_client.post(self.post_edit_url, {
+            'text': self.post.text, 'group': self.second_group.pk})
+        response = self.unauthorized_client.get(self.group_url,
+                                                HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_profile_archive(self):
+        """Проверка потоковой выгрузки архива автора."""
+        url = reverse('profile_archive',
+                      kwargs={'username': self.user.username})
+        response = self.one_more_authorized_client.get(url)
+        self.assertRedirects(response, self.profile_url)
+
+        response = self.authorized_client.get(url, {'format': 'csv'})
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertTrue(lines[0].startswith('record,id,'))
+        self.assertEqual(len(lines), 1 + self.user.posts.count())
+
+        response = self.authorized_client.get(url, {'format': 'jsonl',
+                                                    'zip': 1})
+        archive = zipfile.ZipFile(
+            io.BytesIO(b''.join(response.streaming_content)))
+        names = archive.namelist()
+        self.assertIn(f'{self.user.username}.jsonl', names)
+        image = next(name for name in names if name.startswith('images/'))
+        self.assertEqual(archive.read(image), self.small_gif)
+
+    @override_settings(COMMENTS_PER_PAGE=20)
+    def test_comments_load_more(self):
+        """Проверка постраничного вывода и подгрузки комментариев."""
+        for i in range(25):
+            Comment.objects.create(post=self.post, author=self.one_more_user,
+                                   text=f'Комментарий номер {i:02}')
+        response = self.unauthorized_client.get(self.post_url)
+        comments = response.context['comments']
+        self.assertEqual(len(comments), 20)
+        self.assertEqual(comments[0].text, 'Комментарий номер 00')
+        self.assertContains(response, 'Показать ещё')
+        self.assertNotContains(response, 'Комментарий номер 20')
+        # Выведенные комментарии уже выбраны страницей
+        with self.assertNumQueries(0):
+            self.assertEqual(len(response.context['comment_list']), 20)
+
+        more_url = reverse('post_comments', kwargs={
+            'username': self.user.username, 'post_id': self.post.pk})
+        response = self.unauthorized_client.get(
+            more_url, {'after': comments.next_cursor})
+        self.assertEqual([item.text for item in response.context['comments']],
+                         [f'Комментарий номер {i}' for i in range(20, 25)])
+        self.assertNotContains(response, 'Показать ещё')
+        self.assertNotContains(response, '<html>')
+
+        response = self.unauthorized_client.get(self.post_url,
+                                                {'order': 'newest'})
+        self.assertEqual(response.context['comments'][0].text,
+                         'Комментарий номер 24')
+
+    @override_settings(POST_VIEWS_FLUSH_SECONDS=60 * 60)
+    def test_post_views_write_behind(self):
+        """Проверка пакетной записи просмотров поста в БД."""
+        # Просмотры из предыдущих тестов
+        counters.flush_views()
+        self.post.refresh_from_db()
+        start = self.post.views
+        for views in range(1, 4):
+            cache.clear()
+            response = self.unauthorized_client.get(self.post_url)
+            self.assertContains(response, f'Просмотров: {start + views}')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, start)
+
+        # Просмотры, записанные другим воркером, не перезаписываются
+        Post.objects.filter(pk=self.post.pk).update(views=100)
+        self.assertEqual(counters.flush_views(), 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, 103)
+        response = self.unauthorized_client.get(self.post_url)
+        self.assertContains(response, 'Просмотров: 104')
+
+    @override_settings(POST_VIEWS_FLUSH_TIMER=True)
+    def test_post_views_flush_timer(self):
+        """Проверка сброса просмотров по таймеру без новых запросов."""
+        counters.flush_views()
+        self.post.refresh_from_db()
+        start = self.post.views
+        with mock.patch.object(counters.threading, 'Timer') as timer, \
+                mock.patch.object(counters.connections, 'close_all'):
+            self.unauthorized_client.get(self.post_url)
+            cache.clear()
+            self.unauthorized_client.get(self.post_url)
+            timer.assert_called_once_with(settings.POST_VIEWS_FLUSH_SECONDS,
+                                          counters.flush_on_timer)
+            timer.return_value.start.assert_called_once_with()
+            self.post.refresh_from_db()
+            self.assertEqual(self.post.views, start)
+            counters.flush_on_timer()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, start + 2)
+
+    def test_edit_button_only_for_author(self):
+        """Проверка кнопки редактирования в кэшированной карточке поста."""
+        cache.clear()
+        author_response = self.authorized_client.get(self.profile_url)
+        other_response = self.one_more_authorized_client.get(self.profile_url)
+        self.assertContains(author_response, self.post_edit_url)
+        self.assertNotContains(other_response, self.post_edit_url)
+
+    def test_edit_button_in_cached_index(self):
+        """Проверка кнопки редактирования в кэшированном фрагменте главной."""
+        for first, second in ((self.one_more_authorized_client,
+                               self.authorized_client),
+                              (self.authorized_client,
+                               self.one_more_authorized_client)):
+            cache.clear()
+            first_response = first.get(self.index_url)
+            second_response = second.get(self.index_url)
+            author_response, other_response = (
+                (second_response, first_response)
+                if second is self.authorized_client
+                else (first_response, second_response))
+            self.assertContains(author_response, self.post_edit_url)
+            self.assertNotContains(other_response, self.post_edit_url)
+
+    def test_cached_card_after_rename(self):
+        """Проверка карточек после смены названия группы и имени автора."""
+        cache.clear()
+        response = self.unauthorized_client.get(self.profile_url)
+        self.assertContains(response, self.group.title)
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = 'NewTitle'
+        group.save()
+        user = User.objects.get(pk=self.user.pk)
+        user.username = 'RenamedStas'
+        user.save()
+        response = self.unauthorized_client.get(reverse(
+            'profile', kwargs={'username': 'RenamedStas'}))
+        self.assertContains(response, 'NewTitle')
+        self.assertContains(response, '@RenamedStas')
+        self.assertNotContains(response, '@StasBasov')
+
+    def test_not_modified_after_group_change(self):
+        """Проверка сброса ETag страниц постов группы при её изменении."""
+        urls = (self.profile_url, self.post_url, self.group_url)
+        etags = {url: self.unauthorized_client.get(url)['ETag']
+                 for url in urls}
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'renamed-group'
+        group.save()
+        for url in urls:
+            response = self.unauthorized_client.get(
+                url, HTTP_IF_NONE_MATCH=etags[url])
+            self.assertNotEqual(response.status_code, 304, url)
+        response = self.unauthorized_client.get(self.group_url)
+        self.assertEqual(response.status_code, 404)
+
     def test_authorized_user_follow(self):
         """Проверка возможности подписки авторизованным пользователем."""
         current_follower_count = self.user.follower.count()
@@ -212,6 +500,42 @@ class ViewTests(TestCase):
         response = self.authorized_client.get(self.follow_url)
         self.assertContains(response, text)
 
+    @override_settings(POSTS_FANOUT_MAX_FOLLOWERS=1)
+    def test_follow_show_large_author(self):
+        """
+        Проверка отображения ленты постов.
+
+        Посты автора с большим числом подписчиков не раскладываются по
+        лентам, а подмешиваются при чтении.
+        """
+        Follow.objects.create(user=self.user, author=self.author)
+        text = "Пост популярного автора"
+        post = Post.objects.create(author=self.author, text=text)
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        response = self.authorized_client.get(self.follow_url)
+        self.assertContains(response, text)
+
+    @override_settings(POSTS_FANOUT_MAX_FOLLOWERS=2)
+    def test_follow_show_author_below_threshold(self):
+        """
+        Проверка ленты после того, как автор стал небольшим.
+
+        Посты, написанные, пока у автора было много подписчиков,
+        раскладываются по лентам при отписке ниже порога.
+        """
+        Follow.objects.create(user=self.user, author=self.author)
+        Follow.objects.create(user=self.one_more_user, author=self.author)
+        text = 'Пост ещё популярного автора'
+        post = Post.objects.create(author=self.author, text=text)
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.one_more_authorized_client.get(self.profile_unfollow_url)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.user, post=post).exists())
+        for params in ({}, {'after': encode_cursor(
+                [post.pub_date + timedelta(seconds=1), 0])}):
+            response = self.authorized_client.get(self.follow_url, params)
+            self.assertContains(response, text)
+
     def test_not_follow_show(self):
         """
         Проверка отображения ленты постов.
@@ -268,3 +592,5 @@ class ViewTests(TestCase):
     @classmethod
     def tearDownClass(cls):
         cls.fp.close()
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
@@ -0,0 +1,121 @@
+"""
+Фоновая генерация миниатюр изображений постов.
+
+Миниатюры всех геометрий из POSTS_THUMBNAILS строятся пулом потоков вне
+обработки запроса сразу после сохранения изображения. Шаблоны получают
+готовые адрес и размеры миниатюры из кэша, а до окончания генерации
+выводят заглушку. Готовая миниатюра меняет версии страниц поста, чтобы
+заглушка не осталась в кэшированных фрагментах и за ответами 304.
+При POSTS_THUMBNAIL_WORKERS = 0 миниатюры строятся сразу после фиксации
+транзакции в том же потоке.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from sorl.thumbnail import get_thumbnail
+
+from .caching import bump_version
+from .models import Post
+from .signals import page_scopes
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_KEY = 'posts:thumbnail:{}:{}'
+PENDING_KEY = 'posts:thumbnail-pending:{}'
+PENDING_TIMEOUT = 60 * 5
+
+_executor = None
+if settings.POSTS_THUMBNAIL_WORKERS:
+    _executor = ThreadPoolExecutor(
+        max_workers=settings.POSTS_THUMBNAIL_WORKERS,
+        thread_name_prefix='thumbnails')
+
+
+def thumbnail_key(name, alias):
+    """Ключ кэша с данными миниатюры изображения."""
+    return THUMBNAIL_KEY.format(alias, name)
+
+
+def generate_thumbnails(name):
+    """Построение миниатюр изображения для всех настроенных геометрий."""
+    try:
+        for alias, (geometry, options) in settings.POSTS_THUMBNAILS.items():
+            thumbnail = get_thumbnail(name, geometry, **options)
+            if not thumbnail.exists():
+                logger.warning('Не удалось построить миниатюру %s', name)
+                return
+            cache.set(thumbnail_key(name, alias), {
+                'url': thumbnail.url,
+                'width': thumbnail.width,
+                'height': thumbnail.height,
+            }, None)
+        bump_image_pages(name)
+    except Exception:
+        logger.exception('Ошибка генерации миниатюры %s', name)
+    finally:
+        cache.delete(PENDING_KEY.format(name))
+
+
+def bump_image_pages(name):
+    """Смена версий страниц постов с изображением `name`."""
+    posts = Post.objects.filter(image=name).values_list(
+        'pk', 'author__username', 'group__slug')
+    bump_version(*(scope for row in posts for scope in page_scopes(*row)))
+
+
+def generate_in_pool(name):
+    try:
+        generate_thumbnails(name)
+    finally:
+        # Соединения потока пула не закрываются обработкой запроса
+        connections.close_all()
+
+
+def run_generation(name):
+    if _executor is None:
+        generate_thumbnails(name)
+    else:
+        _executor.submit(generate_in_pool, name)
+
+
+def schedule_thumbnails(name):
+    """Постановка генерации миниатюр в очередь после фиксации транзакции."""
+    if not cache.add(PENDING_KEY.format(name), True, PENDING_TIMEOUT):
+        return
+    transaction.on_commit(lambda: run_generation(name))
+
+
+def get_thumbnail_data(post, alias='card'):
+    """
+    Адрес и размеры готовой миниатюры изображения поста или None.
+
+    Используются данные prefetch_thumbnails, если они есть. Если миниатюра
+    ещё не построена, её генерация ставится в очередь.
+    """
+    if not post.image:
+        return None
+    if hasattr(post, 'thumbnail'):
+        return post.thumbnail
+    data = cache.get(thumbnail_key(post.image.name, alias))
+    if data is None:
+        schedule_thumbnails(post.image.name)
+    return data
+
+
+def prefetch_thumbnails(posts, alias='card'):
+    """
+    Загрузка данных миниатюр для всех постов страницы одним запросом.
+
+    Результат сохраняется в атрибуте `thumbnail` каждого поста.
+    """
+    posts = [post for post in posts if post.image]
+    keys = {post.pk: thumbnail_key(post.image.name, alias) for post in posts}
+    found = cache.get_many(keys.values())
+    for post in posts:
+        post.thumbnail = found.get(keys[post.pk])
+        if post.thumbnail is None:
+            schedule_thumbnails(post.image.name)
+    return posts
@@ -0,0 +1,179 @@
+"""
+Материализованная лента подписок (fan-out on write).
+
+Новый пост раскладывается по лентам подписчиков автора, подписка
+дозаполняет ленту последними постами автора, отписка удаляет их.
+Посты авторов с числом подписчиков не меньше POSTS_FANOUT_MAX_FOLLOWERS
+не раскладываются, а подмешиваются в ленту при чтении (fan-out on read).
+Когда автор опускается ниже порога, его последние посты раскладываются
+по лентам всех подписчиков, иначе они пропали бы из лент.
+
+Лента сортируется по аннотациям FEED_CURSOR_FIELDS: без крупных авторов
+это поля записи ленты (индекс по пользователю и дате), с ними - поля
+поста (индекс по дате поста).
+"""
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+
+from .caching import bump_version
+from .models import AuthorStats, Follow, Post, TimelineEntry
+
+BATCH_SIZE = 500
+FEED_CURSOR_FIELDS = ('feed_date', 'feed_id')
+
+
+def is_fanout_author(author):
+    """Раскладываются ли посты автора по лентам подписчиков."""
+    stats = AuthorStats.for_user(author)
+    return stats.followers < settings.POSTS_FANOUT_MAX_FOLLOWERS
+
+
+def fan_out_post(post):
+    """Добавление нового поста в ленты подписчиков автора."""
+    if not is_fanout_author(post.author):
+        return
+    followers = list(Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True))
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post_id=post.pk,
+                       author_id=post.author_id, pub_date=post.pub_date)
+         for user_id in followers),
+        batch_size=BATCH_SIZE, ignore_conflicts=True)
+    bump_feeds(followers)
+
+
+def bump_feeds(user_ids):
+    """Смена версий лент подписок, например для пересчёта числа постов."""
+    if user_ids:
+        bump_version(*(f'feed:{user_id}' for user_id in user_ids))
+
+
+def bump_author_feeds(author_id):
+    """Смена версий лент подписчиков автора после удаления его поста."""
+    # У крупных авторов число постов в лентах подписчиков устаревает
+    # не дольше PAGINATOR_COUNT_TIMEOUT
+    bump_feeds(list(Follow.objects.filter(
+        author_id=author_id).values_list('user_id', flat=True)[
+        :settings.POSTS_FANOUT_MAX_FOLLOWERS]))
+
+
+def backfill(follow):
+    """Дозаполнение ленты последними постами автора после подписки."""
+    if not is_fanout_author(follow.author):
+        return
+    posts = Post.objects.filter(author_id=follow.author_id).order_by(
+        '-pub_date').values_list('pk', 'pub_date')[
+        :settings.POSTS_TIMELINE_BACKFILL]
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=follow.user_id, post_id=post_id,
+                       author_id=follow.author_id, pub_date=pub_date)
+         for post_id, pub_date in posts],
+        batch_size=BATCH_SIZE, ignore_conflicts=True)
+
+
+def refill_author(author_id):
+    """
+    Раскладка последних постов автора по лентам всех подписчиков.
+
+    Выполняется, когда после отписки автор опустился ниже порога
+    POSTS_FANOUT_MAX_FOLLOWERS: его посты, написанные, пока он был
+    крупным, в ленты не раскладывались.
+    """
+    followers = AuthorStats.objects.filter(pk=author_id).values_list(
+        'followers', flat=True).first()
+    if followers != settings.POSTS_FANOUT_MAX_FOLLOWERS - 1:
+        return 0
+    timeline = TimelineEntry._meta.db_table
+    post = Post._meta.db_table
+    sql = f"""
+        INSERT INTO {timeline} (user_id, post_id, author_id, pub_date)
+        SELECT f.user_id, p.id, p.author_id, p.pub_date
+        FROM {Follow._meta.db_table} f
+        CROSS JOIN (
+            SELECT id, author_id, pub_date FROM {post}
+            WHERE author_id = %s
+            ORDER BY pub_date DESC, id DESC LIMIT %s
+        ) p
+        WHERE f.author_id = %s AND NOT EXISTS (
+            SELECT 1 FROM {timeline} t
+            WHERE t.user_id = f.user_id AND t.post_id = p.id
+        )
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(sql, [author_id, settings.POSTS_TIMELINE_BACKFILL,
+                             author_id])
+        rows = cursor.rowcount
+    bump_author_feeds(author_id)
+    return rows
+
+
+def prune(follow):
+    """Удаление постов автора из ленты после отписки."""
+    TimelineEntry.objects.filter(user_id=follow.user_id,
+                                 author_id=follow.author_id).delete()
+
+
+def rebuild_all():
+    """
+    Пересборка всех лент по подпискам одним INSERT ... SELECT.
+
+    Требует актуальной AuthorStats (см. recount_author_stats).
+    """
+    timeline = TimelineEntry._meta.db_table
+    sql = f"""
+        INSERT INTO {timeline} (user_id, post_id, author_id, pub_date)
+        SELECT user_id, post_id, author_id, pub_date FROM (
+            SELECT f.user_id, p.id AS post_id, p.author_id, p.pub_date,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY f.id ORDER BY p.pub_date DESC, p.id DESC
+                   ) AS position
+            FROM {Follow._meta.db_table} f
+            JOIN {Post._meta.db_table} p ON p.author_id = f.author_id
+            LEFT JOIN {AuthorStats._meta.db_table} s
+                ON s.user_id = f.author_id
+            WHERE COALESCE(s.followers, 0) < %s
+        ) ranked
+        WHERE position <= %s
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {timeline}')
+        cursor.execute(sql, [settings.POSTS_FANOUT_MAX_FOLLOWERS,
+                             settings.POSTS_TIMELINE_BACKFILL])
+        return cursor.rowcount
+
+
+def feed_queryset(user, cursor=False):
+    """
+    Посты ленты подписок пользователя.
+
+    Лента читается из материализованной таблицы, посты крупных авторов
+    подмешиваются по подписке в момент запроса. Для курсорной пагинации
+    (`cursor=True`) ключ сортировки доступен в аннотациях
+    FEED_CURSOR_FIELDS; постраничному режиму аннотации не нужны, с ними
+    COUNT(*) выполнялся бы через подзапрос с GROUP BY.
+    """
+    large_authors = list(Follow.objects.filter(
+        user=user,
+        author__stats__followers__gte=settings.POSTS_FANOUT_MAX_FOLLOWERS,
+    ).values_list('author_id', flat=True))
+    if not large_authors:
+        # Сортировка по полям ленты позволяет читать её по индексу
+        queryset = Post.objects.filter(timeline_entries__user=user)
+        date, pk = 'timeline_entries__pub_date', 'timeline_entries__id'
+    else:
+        # Коррелированный EXISTS вместо IN: SQLite обходит индекс по дате
+        # поста в порядке сортировки, а не объединяет два поиска
+        # (MULTI-INDEX OR) с сортировкой во временном B-дереве
+        post = Post._meta.db_table
+        queryset = Post.objects.extra(where=[
+            f'EXISTS (SELECT 1 FROM {TimelineEntry._meta.db_table} t '
+            f'WHERE t.user_id = %s AND t.post_id = {post}.id) '
+            f'OR {post}.author_id IN '
+            f'({", ".join(["%s"] * len(large_authors))})'
+        ], params=[user.pk, *large_authors])
+        date, pk = 'pub_date', 'id'
+    if cursor:
+        return queryset.annotate(feed_date=F(date), feed_id=F(pk)).order_by(
+            '-feed_date', '-feed_id')
+    return queryset.order_by(f'-{date}', f'-{pk}')
@@ -0,0 +1,169 @@
+"""
+Рейтинг популярных постов и групп.
+
+Активность копится в почасовых корзинах: PostActivity (комментарии и
+просмотры поста) и GroupActivity (новые посты группы). Комментарии и
+посты переносятся в корзины командой refresh_trending инкрементально -
+только записи с id больше сохранённого в TrendingWatermark. В SQLite
+запись идёт в один поток, поэтому id растут в порядке фиксации
+транзакций и за отметкой не остаётся пропущенных строк. Просмотры
+попадают в корзины при сбросе счётчиков posts.counters.
+
+Та же команда удаляет корзины старше TRENDING_WINDOW_HOURS и заново
+заполняет небольшие таблицы TrendingPost и TrendingGroup, которые
+страница популярного читает по индексу. Посты ранжируются по скорости
+активности: свежие корзины весят больше старых. Удалённые комментарии и смена
+группы поста из корзин не вычитаются - рейтинг приблизительный.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Case, Count, F, Max, Sum, Value, When
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from yatube.routers import PRIMARY
+
+from .caching import bump_version
+from .models import (Comment, GroupActivity, Post, PostActivity,
+                     TrendingGroup, TrendingPost, TrendingWatermark)
+
+BATCH_SIZE = 300
+
+
+def hour_of(moment):
+    """Начало часа, к которому относится момент времени."""
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def add_activity(model, owner, field, counts):
+    """
+    Прибавление счётчиков к почасовым корзинам.
+
+    counts - словарь (id владельца, час) -> приращение поля `field`.
+    Недостающие корзины создаются, затем на каждый час выполняется
+    UPDATE с приращениями через F() для пачки владельцев.
+    """
+    manager = model.objects.using(PRIMARY)
+    manager.bulk_create([
+        model(**{f'{owner}_id': owner_id, 'hour': hour})
+        for owner_id, hour in counts
+    ], batch_size=BATCH_SIZE, ignore_conflicts=True)
+    by_hour = defaultdict(list)
+    for (owner_id, hour), count in sorted(counts.items()):
+        by_hour[hour].append((owner_id, count))
+    for hour, items in by_hour.items():
+        for start in range(0, len(items), BATCH_SIZE):
+            batch = items[start:start + BATCH_SIZE]
+            increment = Case(
+                *(When(**{f'{owner}_id': owner_id}, then=Value(count))
+                  for owner_id, count in batch),
+                output_field=models.PositiveIntegerField())
+            manager.filter(hour=hour, **{
+                f'{owner}_id__in': [owner_id for owner_id, _ in batch]
+            }).update(**{field: F(field) + increment})
+
+
+def add_views(counts):
+    """Просмотры постов за текущий час, id поста -> число просмотров."""
+    hour = hour_of(timezone.now())
+    # Пост мог быть удалён, пока просмотры ждали записи
+    existing = Post.objects.using(PRIMARY).filter(
+        pk__in=list(counts)).values_list('pk', flat=True)
+    add_activity(PostActivity, 'post', 'views',
+                 {(pk, hour): counts[pk] for pk in existing})
+
+
+def roll_up(name, queryset, owner, date_field, since):
+    """
+    Перенос новых строк queryset в почасовые корзины.
+
+    Возвращает число учтённых строк; отметка сдвигается на последний id,
+    даже если строки старше окна рейтинга и в корзины не попали.
+    """
+    watermark, _ = TrendingWatermark.objects.select_for_update(
+    ).get_or_create(name=name)
+    top = queryset.aggregate(top=Max('pk'))['top']
+    if top is None or top <= watermark.last_id:
+        return 0
+    rows = queryset.filter(
+        pk__gt=watermark.last_id, pk__lte=top,
+        **{f'{date_field}__gte': since},
+    ).annotate(hour=Trunc(date_field, 'hour')).order_by().values(
+        f'{owner}_id', 'hour').annotate(total=Count('pk'))
+    counts = {(row[f'{owner}_id'], row['hour']): row['total']
+              for row in rows}
+    model, field = {
+        'post': (PostActivity, 'comments'),
+        'group': (GroupActivity, 'posts'),
+    }[owner]
+    add_activity(model, owner, field, counts)
+    watermark.last_id = top
+    watermark.save()
+    return sum(counts.values())
+
+
+def rank_posts(since):
+    """
+    Рейтинг постов по скорости набора комментариев и просмотров.
+
+    Вклад часовой корзины убывает линейно с её возрастом: текущий час
+    идёт с весом 1, первый час окна - с весом 1 / TRENDING_WINDOW_HOURS.
+    В таблицу попадают и невзвешенные суммы за окно для показа.
+    """
+    weights = (settings.TRENDING_COMMENT_WEIGHT,
+               settings.TRENDING_VIEW_WEIGHT)
+    hours = settings.TRENDING_WINDOW_HOURS
+    recency = Case(
+        *(When(hour__lt=since + timedelta(hours=age + 1),
+               then=Value((age + 1) / hours)) for age in range(hours - 1)),
+        default=Value(1.0), output_field=models.FloatField())
+    rows = PostActivity.objects.filter(hour__gte=since).values(
+        'post_id').annotate(
+        score=Sum(
+            (F('comments') * weights[0] + F('views') * weights[1])
+            * recency, output_field=models.FloatField()),
+    ).annotate(
+        comments=Sum('comments'), views=Sum('views'),
+    ).filter(score__gt=0).order_by('-score', '-post_id')[
+        :settings.TRENDING_SIZE]
+    TrendingPost.objects.all().delete()
+    TrendingPost.objects.bulk_create(
+        TrendingPost(rank=rank, **row) for rank, row in enumerate(rows, 1))
+
+
+def rank_groups(since):
+    rows = GroupActivity.objects.filter(hour__gte=since).values(
+        'group_id').annotate(posts=Sum('posts')).filter(
+        posts__gt=0).order_by('-posts', 'group_id')[
+        :settings.TRENDING_SIZE]
+    TrendingGroup.objects.all().delete()
+    TrendingGroup.objects.bulk_create(
+        TrendingGroup(rank=rank, **row) for rank, row in enumerate(rows, 1))
+
+
+def refresh(now=None):
+    """
+    Обновление корзин активности и рейтингов популярного.
+
+    Возвращает словарь с числом учтённых комментариев и постов.
+    """
+    now = now or timezone.now()
+    since = hour_of(now) - timedelta(
+        hours=settings.TRENDING_WINDOW_HOURS - 1)
+    with transaction.atomic(using=PRIMARY):
+        stats = {
+            'comments': roll_up('comments', Comment.objects, 'post',
+                                'created', since),
+            'posts': roll_up('posts', Post.objects.filter(
+                group__isnull=False), 'group', 'pub_date', since),
+        }
+        PostActivity.objects.filter(hour__lt=since).delete()
+        GroupActivity.objects.filter(hour__lt=since).delete()
+        rank_posts(since)
+        rank_groups(since)
+        transaction.on_commit(lambda: bump_version('trending'),
+                              using=PRIMARY)
+    return stats
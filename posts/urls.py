@@ -1,12 +1,22 @@
 from django.urls import path
 
-from . import views
+from . import api, views
 
 urlpatterns = [
     path("", views.index, name='index'),
     path('group/<slug:slug>/', views.group_posts, name='group'),
     path('new/', views.PostCreate.as_view(), name='new_post'),
+    path('search/', views.search, name='search'),
+    path('trending/', views.trending, name='trending'),
+    path('api/posts/', api.index, name='api_index'),
+    path('api/group/<slug:slug>/', api.group_posts, name='api_group'),
+    path('api/follow/', api.follow_index, name='api_follow_index'),
+    path('api/<str:username>/', api.profile, name='api_profile'),
+    path('api/<str:username>/<int:post_id>/', api.post_view,
+         name='api_post'),
     path('<str:username>/<int:post_id>/', views.post_view, name='post'),
+    path('<str:username>/<int:post_id>/comments/', views.post_comments,
+         name='post_comments'),
     path('<str:username>/<int:post_id>/edit/', views.PostEdit.as_view(),
          name='post_edit'),
     path("<username>/<int:post_id>/comment/", views.CommentCreate.as_view(),
@@ -16,6 +26,8 @@ urlpatterns = [
          name="profile_follow"),
     path("<str:username>/unfollow/", views.profile_unfollow,
          name="profile_unfollow"),
+    path('<str:username>/archive/', views.profile_archive,
+         name='profile_archive'),
     path('<str:username>/', views.profile, name='profile'),
     # Просмотр записи
 
@@ -1,45 +1,62 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import (LoginRequiredMixin,
                                         PermissionRequiredMixin)
-from django.core.paginator import Paginator
-from django.db.models import Count
-from django.http import HttpResponseRedirect
+from django.db import transaction
+from django.http import HttpResponseRedirect, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, render, redirect
 from django.urls import reverse
+from django.utils.http import urlencode
 from django.urls import reverse_lazy
 from django.views.generic import CreateView, UpdateView
 
+from . import counters
+from .archive import FORMATS, stream_archive, stream_zip
+from .caching import conditional_page, versions_digest
 from .forms import CommentForm, PostForm
-from .models import Group, Post, Follow
+from .models import (AuthorStats, Group, Post, Follow, TrendingGroup,
+                     TrendingPost)
+from .pagination import CursorPaginator, is_cursor_mode, paginate
+from .search import search_posts
+from .thumbnails import prefetch_thumbnails
+from .timeline import FEED_CURSOR_FIELDS, feed_queryset
 
 User = get_user_model()
 
 
+@conditional_page('index')
 def index(request):
     """Представление для отображения главной страницы."""
-    post_list = Post.objects.select_related('author', 'group').annotate(
-        posts_comments=Count('comments')).order_by('-pub_date')
-    # .annotate(posts_comments=Count('comments'))
-    paginator = Paginator(post_list, 10)
-
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    post_list = Post.objects.select_related('author', 'group')
+    paginator, page = paginate(request, post_list, count_scope='index')
+    prefetch_thumbnails(page)
+    # Фрагмент страницы зависит от состава главной и от её постов и групп,
+    # поэтому правка поста не сбрасывает кэш остальных страниц
+    groups = {post.group.slug for post in page if post.group_id}
+    index_version = versions_digest(
+        'index:list', *(f'post:{post.pk}' for post in page),
+        *(f'group:{slug}' for slug in sorted(groups)))
     return render(
         request,
         'index.html',
-        {'page': page, 'paginator': paginator}
+        {
+            'page': page,
+            'paginator': paginator,
+            'index_version': index_version,
+            'index_cache_timeout': settings.INDEX_CACHE_TIMEOUT,
+        }
     )
 
 
+@conditional_page('group:{slug}')
 def group_posts(request, slug):
     """Представление для вывода постов в группе."""
     group = get_object_or_404(Group, slug=slug)
     post_list = group.posts.select_related('author')
-    paginator = Paginator(post_list, 10)
-
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    paginator, page = paginate(request, post_list,
+                               count_scope=f'group:{slug}')
+    prefetch_thumbnails(page)
     return render(
         request,
         'group.html',
@@ -103,6 +120,7 @@ class PostEdit(LoginRequiredMixin, PermissionRequiredMixin,
         return context
 
 
+@conditional_page('author:{username}')
 def profile(request, username):
     """Представление для отображения профиля пользователя."""
     author = get_object_or_404(User, username=username)
@@ -110,30 +128,118 @@ def profile(request, username):
     following = request.user.is_authenticated and Follow.objects.filter(
         author=author,
         user=request.user).exists()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    paginator, page = paginate(request, post_list,
+                               count_scope=f'author:{username}')
+    prefetch_thumbnails(page)
     return render(request, 'profile.html', {
         'author': author,
+        'author_stats': AuthorStats.for_user(author),
         'page': page,
         'paginator': paginator,
         'following': following,
     })
 
 
+def comments_page(request, post):
+    """
+    Страница комментариев поста по курсору `?after=`.
+
+    По умолчанию комментарии идут от старых к новым, `?order=newest`
+    выводит сначала новые.
+    """
+    order = 'newest' if request.GET.get('order') == 'newest' else ''
+    paginator = CursorPaginator(
+        post.comments.select_related('author'), settings.COMMENTS_PER_PAGE,
+        fields=('created', 'id'), descending=bool(order))
+    return paginator.get_page(after=request.GET.get('after')), order
+
+
+@conditional_page('post:{post_id}', 'author:{username}')
 def post_view(request, username, post_id):
     """Представление для просмотра поста."""
     post = get_object_or_404(Post, author__username=username, pk=post_id)
     form = CommentForm()
-    comments = post.comments.select_related('author')
+    comments, order = comments_page(request, post)
+    # Ответы 304 на повторные запросы браузера просмотрами не считаются
+    views = post.views + counters.record_view(post.pk)
     return render(request, 'post.html', {
         'post': post,
+        'views': views,
+        'author_stats': AuthorStats.for_user(post.author),
         'form': form,
+        'comment_list': comments.object_list,
         'comments': comments,
+        'order': order,
         'hide_comment_btn': True,
     })
 
 
+@conditional_page('post:{post_id}')
+def post_comments(request, username, post_id):
+    """Фрагмент со следующей страницей комментариев для «Показать ещё»."""
+    post = get_object_or_404(Post.objects.select_related('author'),
+                             author__username=username, pk=post_id)
+    comments, order = comments_page(request, post)
+    return render(request, 'comment_list.html', {
+        'post': post,
+        'comment_list': comments.object_list,
+        'comments': comments,
+        'order': order,
+    })
+
+
+@login_required
+def profile_archive(request, username):
+    """Потоковая выгрузка постов и комментариев автора."""
+    if request.user.username != username:
+        return redirect('profile', username=username)
+    archive_format = request.GET.get('format')
+    if archive_format not in FORMATS:
+        archive_format = FORMATS[0]
+    if request.GET.get('zip'):
+        response = StreamingHttpResponse(
+            stream_zip(request.user, archive_format),
+            content_type='application/zip')
+        filename = f'{username}.zip'
+    else:
+        response = StreamingHttpResponse(
+            stream_archive(request.user, archive_format),
+            content_type=('text/csv; charset=utf-8'
+                          if archive_format == 'csv'
+                          else 'application/x-ndjson; charset=utf-8'))
+        filename = f'{username}.{archive_format}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def search(request):
+    """Представление полнотекстового поиска по постам."""
+    query = request.GET.get('q', '').strip()
+    page = None
+    if query:
+        page = search_posts(query, settings.POSTS_PER_PAGE,
+                            after=request.GET.get('after'))
+    return render(request, 'search.html', {
+        'query': query,
+        'page': page,
+        'extra_query': urlencode({'q': query}),
+    })
+
+
+@conditional_page('trending', 'index')
+def trending(request):
+    """Представление популярных постов и групп из рейтинга refresh_trending."""
+    entries = list(TrendingPost.objects.select_related(
+        'post__author', 'post__group').order_by('rank'))
+    prefetch_thumbnails([entry.post for entry in entries])
+    groups = TrendingGroup.objects.select_related('group').order_by('rank')
+    return render(request, 'trending.html', {
+        'entries': entries,
+        'groups': groups,
+        'window_hours': settings.TRENDING_WINDOW_HOURS,
+    })
+
+
 def page_not_found(request, exception):
     """Отображает страницу 404 ошибки"""
     return render(
@@ -164,18 +270,21 @@ class CommentCreate(LoginRequiredMixin, CreateView):
         self.success_url = reverse_lazy('post', kwargs=self.kwargs)
         form.instance.author = self.request.user
         form.instance.post_id = post_id
-        return super().form_valid(form)
+        # Комментарий и счётчик поста сохраняются в одной транзакции
+        with transaction.atomic():
+            return super().form_valid(form)
 
 
 @login_required
 def follow_index(request):
     """Представление ленты подписок."""
-    post_list = Post.objects.filter(
-        author__following__user=request.user)
-    paginator = Paginator(post_list, 10)
-
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    post_list = feed_queryset(
+        request.user, cursor=is_cursor_mode(request)).select_related(
+        'author', 'group')
+    paginator, page = paginate(request, post_list,
+                               count_scope=f'feed:{request.user.pk}',
+                               cursor_fields=FEED_CURSOR_FIELDS)
+    prefetch_thumbnails(page)
     return render(
         request,
         'follow.html',
@@ -0,0 +1,48 @@
+"""
+Загрузка пользователя запроса из кэша.
+
+AuthenticationMiddleware на каждом запросе читает строку пользователя из
+БД. CachedModelBackend хранит пользователя в общем для воркеров кэше, а
+обработчики сигналов users.signals удаляют запись при изменении
+пользователя (включая смену пароля) и при выходе из аккаунта. Сигналы не
+вызываются для QuerySet.update() и bulk_update(): после массового
+изменения пользователей вызывайте forget_user.
+"""
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+
+USER_KEY = 'users:user:{}'
+
+
+def user_key(user_id):
+    return USER_KEY.format(user_id)
+
+
+def forget_user(user_id):
+    """Удаление пользователя из кэша, следующий запрос прочитает БД."""
+    cache.delete(user_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend, читающий пользователя сессии из кэша."""
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        user = super().authenticate(request, username, password, **kwargs)
+        if user is None:
+            # Следующий в списке ModelBackend нужен только для сессий,
+            # созданных до перехода на кэш: повторная проверка пароля
+            # лишь удвоила бы время неудачного входа
+            raise PermissionDenied
+        return user
+
+    def get_user(self, user_id):
+        key = user_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(key, user, settings.USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
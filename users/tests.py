@@ -1,3 +1,63 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from .backends import user_key
+
+User = get_user_model()
+
+
+class CachedAuthTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """Установка переменных для тестирования."""
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='StasBasov',
+                                            password='Pa55w0rd!')
+        cls.signup_url = reverse('signup')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.login(username='StasBasov',
+                                     password='Pa55w0rd!')
+
+    def test_cached_user_and_session(self):
+        """Проверка загрузки пользователя и сессии без запросов к БД."""
+        response = self.authorized_client.get(self.signup_url)
+        self.assertTrue(response.context['user'].is_authenticated)
+        with self.assertNumQueries(0):
+            response = self.authorized_client.get(self.signup_url)
+        self.assertEqual(response.context['user'], self.user)
+
+    def test_legacy_session_stays_valid(self):
+        """Проверка сессий, созданных до перехода на кэш пользователей."""
+        client = Client()
+        client.force_login(
+            self.user, backend='django.contrib.auth.backends.ModelBackend')
+        response = client.get(self.signup_url)
+        self.assertEqual(response.context['user'], self.user)
+
+    def test_failed_login(self):
+        """Проверка неудачного входа с неверным паролем."""
+        self.assertFalse(Client().login(username='StasBasov',
+                                        password='wrong'))
+
+    def test_password_change_logs_out(self):
+        """Проверка сброса кэша и сессии при смене пароля."""
+        self.authorized_client.get(self.signup_url)
+        self.user.set_password('N3wPa55w0rd!')
+        self.user.save()
+        self.assertIsNone(cache.get(user_key(self.user.pk)))
+        response = self.authorized_client.get(self.signup_url)
+        self.assertFalse(response.context['user'].is_authenticated)
+
+    def test_logout_forgets_user(self):
+        """Проверка сброса кэша пользователя при выходе."""
+        self.authorized_client.get(self.signup_url)
+        self.assertIsNotNone(cache.get(user_key(self.user.pk)))
+        self.authorized_client.get(reverse('logout'))
+        self.assertIsNone(cache.get(user_key(self.user.pk)))
+        response = self.authorized_client.get(self.signup_url)
+        self.assertFalse(response.context['user'].is_authenticated)
@@ -0,0 +1,170 @@
+"""
+Учёт SQL-запросов и времени обработки HTTP-запросов.
+
+ServerTimingMiddleware считает запросы к БД и время их выполнения,
+время отрисовки шаблонов и общее время ответа, отдаёт их в заголовке
+`Server-Timing` и пишет в лог запросы, вышедшие за бюджет представления
+из настройки REQUEST_BUDGETS.
+
+ReplicaPinningMiddleware закрепляет чтение за основной базой для
+запросов, изменяющих данные, и на короткое время после них.
+
+ThrottleMiddleware отвечает 429 на запросы на запись сверх лимитов
+THROTTLE_RATES.
+"""
+import logging
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from django.template.backends import django as django_backend
+
+from . import routers, throttling
+
+logger = logging.getLogger('yatube.budget')
+
+_local = threading.local()
+
+
+class RequestStats:
+    """Счётчики одного HTTP-запроса."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+
+    def track_query(self, execute, sql, params, many, context):
+        """Обёртка выполнения SQL для connection.execute_wrapper."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+
+def _instrument_templates():
+    """Учёт времени отрисовки шаблонов верхнего уровня."""
+    template_class = django_backend.Template
+    if getattr(template_class.render, 'instrumented', False):
+        return
+    original_render = template_class.render
+
+    def render(self, *args, **kwargs):
+        stats = getattr(_local, 'stats', None)
+        if stats is None:
+            return original_render(self, *args, **kwargs)
+        # Вложенные render_to_string (например, из post_card) уже входят во
+        # время внешнего шаблона
+        depth = getattr(_local, 'depth', 0)
+        _local.depth = depth + 1
+        start = None if depth else time.perf_counter()
+        try:
+            return original_render(self, *args, **kwargs)
+        finally:
+            _local.depth = depth
+            if start is not None:
+                stats.template_time += time.perf_counter() - start
+
+    render.instrumented = True
+    template_class.render = render
+
+
+def get_budget(url_name):
+    """Бюджет представления: число запросов и время ответа в мс."""
+    budgets = settings.REQUEST_BUDGETS
+    return budgets.get(url_name, budgets['default'])
+
+
+class ServerTimingMiddleware:
+    """Заголовок Server-Timing и контроль бюджета запросов к БД."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        _instrument_templates()
+
+    def __call__(self, request):
+        stats = RequestStats()
+        _local.stats = stats
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(stats.track_query))
+                response = self.get_response(request)
+        finally:
+            _local.stats = None
+        total = (time.perf_counter() - start) * 1000
+
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={stats.db_time * 1000:.1f};'
+            f'desc="{stats.queries} queries"',
+            f'tpl;dur={stats.template_time * 1000:.1f}',
+            f'app;dur={total:.1f}',
+        ))
+        match = request.resolver_match
+        url_name = match.url_name if match else None
+        budget = get_budget(url_name)
+        if stats.queries > budget['queries'] or total > budget['ms']:
+            logger.warning(
+                'Превышен бюджет %s (%s): %d запросов к БД за %.1f мс, '
+                'ответ за %.1f мс', url_name, request.path, stats.queries,
+                stats.db_time * 1000, total)
+        return response
+
+
+class ReplicaPinningMiddleware:
+    """Чтение своих изменений при работе с репликами БД."""
+    cookie_name = 'pin_primary'
+    safe_methods = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routers.pin_primary(
+            request.method not in self.safe_methods
+            or self.cookie_name in request.COOKIES)
+        try:
+            response = self.get_response(request)
+            wrote = routers.has_written()
+        finally:
+            routers.pin_primary(False)
+        if wrote and settings.DATABASE_REPLICAS:
+            # Следующие запросы пользователя читают с основной базы, пока
+            # реплики не догонят её
+            response.set_cookie(
+                self.cookie_name, '1',
+                max_age=settings.REPLICA_PIN_SECONDS, httponly=True,
+                samesite='Lax')
+        return response
+
+
+class ThrottleMiddleware:
+    """Лимит частоты запросов на запись по имени url."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        url_name = request.resolver_match.url_name
+        rates = throttling.get_rates(url_name, request.method)
+        if not rates:
+            return None
+        idents = throttling.client_idents(request, rates)
+        retry_after = throttling.take_token(url_name, rates, idents)
+        if not retry_after:
+            return None
+        response = HttpResponse(
+            'Слишком много запросов, повторите попытку позже.',
+            status=429, content_type='text/plain; charset=utf-8')
+        response['Retry-After'] = str(retry_after)
+        return response
@@ -0,0 +1,58 @@
+"""
+Маршрутизация запросов к БД между основной базой и репликами.
+
+Чтение уходит на случайную реплику из настройки DATABASE_REPLICAS, запись
+- на основную базу `default`. Чтобы пользователь видел собственные
+изменения несмотря на отставание реплик, чтение закрепляется за основной
+базой на время запроса, в котором была запись, и на REPLICA_PIN_SECONDS
+после него (см. ReplicaPinningMiddleware).
+"""
+import random
+import threading
+
+from django.conf import settings
+
+PRIMARY = 'default'
+
+_local = threading.local()
+
+
+def pin_primary(pinned=True):
+    """Закрепление чтения текущего потока за основной базой."""
+    _local.pinned = pinned
+    _local.wrote = False
+
+
+def is_pinned():
+    return getattr(_local, 'pinned', False) or getattr(_local, 'wrote', False)
+
+
+def has_written():
+    """Была ли запись в основную базу с начала запроса."""
+    return getattr(_local, 'wrote', False)
+
+
+class PrimaryReplicaRouter:
+    """Роутер «основная база + реплики только для чтения»."""
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or is_pinned():
+            return PRIMARY
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        # Запросы на запись (включая select_for_update и get_or_create)
+        # закрепляют дальнейшее чтение за основной базой
+        _local.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {PRIMARY, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема реплик повторяет основную базу через репликацию
+        return db not in settings.DATABASE_REPLICAS
@@ -0,0 +1,168 @@
+"""
+Отдача медиа и статических файлов без DEBUG.
+
+Если перед приложением стоит прокси, файл отдаёт он по заголовку
+X-Accel-Redirect (nginx) или X-Sendfile (Apache, lighttpd), и рабочий
+процесс не занят передачей. Иначе файл потоково отдаётся через
+FileResponse с поддержкой ETag/If-None-Match, If-Modified-Since,
+диапазонов байт (Range) и долгого кэширования файлов с хэшем в имени.
+"""
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (FileResponse, Http404, HttpResponse,
+                         HttpResponseNotModified)
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+
+# Имена вида app.55e7cbb9ba48.css (ManifestStaticFilesStorage)
+# и cache/7b/ad/7bada2ba392d60cdc50238fe0b69cd08.jpg (sorl-thumbnail)
+HASHED_NAME = re.compile(r'(^|[./])[0-9a-f]{12,}\.\w+$')
+RANGE_HEADER = re.compile(r'^bytes=(\d*)-(\d*)$')
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+CHUNK_SIZE = 64 * 1024
+
+
+class RangeFile:
+    """Файловый объект, читающий только заданный диапазон байт."""
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.file.seek(start)
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def make_etag(stat):
+    """Сильный валидатор по времени изменения и размеру файла."""
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def cache_control(path):
+    """Заголовок Cache-Control для файла."""
+    if HASHED_NAME.search(path):
+        return f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    return f'public, max-age={settings.FILES_CACHE_MAX_AGE}'
+
+
+def parse_range(header, size):
+    """
+    Диапазон (start, end) из заголовка Range.
+
+    None, если заголовок не задан или не поддерживается (несколько
+    диапазонов), False для невыполнимого диапазона.
+    """
+    match = RANGE_HEADER.match(header.strip()) if header else None
+    if not match or match.group(1) == match.group(2) == '':
+        return None
+    first, last = match.groups()
+    if first == '':
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def not_modified(request, etag, stat):
+    """Совпадает ли версия файла у клиента с текущей."""
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        return etag in tags or '*' in tags
+    since = parse_http_date_safe(
+        request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return since is not None and int(stat.st_mtime) <= since
+
+
+def serve(request, path, document_root=None, internal_prefix=None):
+    """Отдача файла `path` из каталога `document_root`."""
+    path = posixpath.normpath(path).lstrip('/')
+    try:
+        fullpath = safe_join(document_root, path)
+    except SuspiciousFileOperation:
+        raise Http404('Файл не найден')
+    try:
+        stat = os.stat(fullpath)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404('Файл не найден')
+    if not os.path.isfile(fullpath):
+        raise Http404('Файл не найден')
+
+    etag = make_etag(stat)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Cache-Control': cache_control(path),
+        'Accept-Ranges': 'bytes',
+    }
+    if not_modified(request, etag, stat):
+        response = HttpResponseNotModified()
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+    content_type, encoding = mimetypes.guess_type(fullpath)
+    if encoding:
+        # Сжатые файлы отдаются как есть, без распаковки браузером
+        content_type = 'application/octet-stream'
+    content_type = content_type or 'application/octet-stream'
+    backend = settings.SENDFILE_BACKEND
+    if backend == 'nginx' and internal_prefix:
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = quote(internal_prefix + path)
+    elif backend == 'xsendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = fullpath
+    else:
+        response = stream_file(request, fullpath, stat, etag, content_type)
+    for name, value in headers.items():
+        response[name] = value
+    return response
+
+
+def stream_file(request, fullpath, stat, etag, content_type):
+    """Потоковая отдача файла целиком или диапазона байт."""
+    byte_range = None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range is None or if_range == etag:
+        byte_range = parse_range(request.META.get('HTTP_RANGE'),
+                                 stat.st_size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+        return response
+
+    file = open(fullpath, 'rb')
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+        response['Content-Length'] = stat.st_size
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = FileResponse(RangeFile(file, start, length), status=206,
+                                content_type=content_type)
+        response['Content-Length'] = length
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+    response.block_size = CHUNK_SIZE
+    return response
@@ -1,4 +1,6 @@
 import os
+import sys
+import tempfile
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -31,11 +33,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'yatube.middleware.ServerTimingMiddleware',
+    'yatube.middleware.ReplicaPinningMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'yatube.middleware.ThrottleMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     "debug_toolbar.middleware.DebugToolbarMiddleware",
@@ -77,9 +82,40 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Соединение переиспользуется между запросами одного воркера
+        'CONN_MAX_AGE': 60,
     }
 }
 
+# Прагмы SQLite, выполняемые для каждого нового соединения (yatube.sqlite):
+# WAL позволяет читать параллельно с записью, NORMAL в режиме WAL не
+# теряет целостность при сбое, busy_timeout ждёт блокировку вместо
+# ошибки «database is locked»
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'memory',
+}
+
+# Реплики только для чтения. Локально - копии db.sqlite3, пути к которым
+# перечисляются через запятую в YATUBE_DB_REPLICAS
+DATABASE_REPLICAS = []
+for number, path in enumerate(
+        filter(None, os.environ.get('YATUBE_DB_REPLICAS', '').split(',')), 1):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': path,
+        'CONN_MAX_AGE': 60,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+DATABASE_ROUTERS = ['yatube.routers.PrimaryReplicaRouter']
+# Сколько секунд после записи чтение пользователя идёт с основной базы
+REPLICA_PIN_SECONDS = 5
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -111,17 +147,124 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Отдача файлов без DEBUG: None - потоком из Django, 'nginx' - через
+# X-Accel-Redirect на internal-локации ниже, 'xsendfile' - через X-Sendfile
+SENDFILE_BACKEND = None
+SENDFILE_MEDIA_PREFIX = '/internal/media/'
+SENDFILE_STATIC_PREFIX = '/internal/static/'
+# Время кэширования файлов без хэша в имени, с хэшем - год
+FILES_CACHE_MAX_AGE = 60 * 60
+
 # Login
 LOGIN_URL = '/auth/login/'
 LOGIN_REDIRECT_URL = 'index'
+# Пользователь и сессия запроса читаются из кэша, сессии пишутся и в БД.
+# ModelBackend оставлен для сессий, созданных до перехода на кэш.
+AUTHENTICATION_BACKENDS = [
+    'users.backends.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+USER_CACHE_TIMEOUT = 60 * 15
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+# Кэш общий для всех процессов: версии областей, сессии, пользователи и
+# корзины лимитов должны быть видны каждому воркеру. В продакшене задайте
+# YATUBE_MEMCACHED (адреса через запятую, нужен пакет python-memcached),
+# иначе используется файловый кэш, общий для процессов одной машины.
+# Тесты получают свой кэш в памяти: данные прошлых прогонов с теми же id
+# пользователей и постов не должны попадать в новую тестовую базу.
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+if TESTING:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
     }
+elif os.environ.get('YATUBE_MEMCACHED'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+            'LOCATION': os.environ['YATUBE_MEMCACHED'].split(','),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get(
+                'YATUBE_CACHE_DIR',
+                os.path.join(tempfile.gettempdir(), 'yatube-cache')),
+            'OPTIONS': {'MAX_ENTRIES': 100000},
+        }
+    }
+
+# Версии областей кэша создаются и для адресов несуществующих объектов,
+# поэтому хранятся ограниченное время; истёкшая версия лишь сбрасывает
+# кэш области
+CACHE_VERSION_TIMEOUT = 60 * 60 * 24
+# Фрагмент главной страницы инвалидируется сменой версии, а не по времени
+INDEX_CACHE_TIMEOUT = 60 * 60 * 6
+# Миниатюры изображений постов: псевдоним -> (геометрия, опции sorl)
+POSTS_THUMBNAILS = {
+    'card': ('960x339', {'crop': 'center', 'upscale': False}),
 }
+# Потоков генерации миниатюр; в тестах миниатюры строятся синхронно, чтобы
+# фоновый поток не писал в тестовую базу параллельно с тестом
+POSTS_THUMBNAIL_WORKERS = 0 if TESTING else 2
+# Отрисованные карточки постов, ключ включает версию поста
+POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24
 
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 SITE_ID = 1
+
+# Posts feeds
+POSTS_PER_PAGE = 10
+# Курсорная пагинация лент по (pub_date, id) вместо ?page=
+POSTS_CURSOR_PAGINATION = False
+# Посты авторов с таким числом подписчиков подмешиваются в ленту при чтении
+POSTS_FANOUT_MAX_FOLLOWERS = 1000
+# Сколько последних постов автора добавлять в ленту при подписке
+POSTS_TIMELINE_BACKFILL = 100
+# Сколько секунд хранить число постов ленты; кэш сбрасывается и при записи
+PAGINATOR_COUNT_TIMEOUT = 5 * 60
+# Комментариев на странице поста и в одной подгрузке «Показать ещё»
+COMMENTS_PER_PAGE = 20
+# Просмотры постов копятся в памяти и пишутся в БД раз в столько секунд
+POST_VIEWS_FLUSH_SECONDS = 10
+# Сброс по таймеру в фоновом потоке; в тестах - синхронно при просмотре
+POST_VIEWS_FLUSH_TIMER = not TESTING
+# Постов в одном UPDATE при записи просмотров
+POST_VIEWS_FLUSH_BATCH = 300
+# Рейтинг популярного за последние часы, пересчитывается refresh_trending
+TRENDING_WINDOW_HOURS = 24
+TRENDING_SIZE = 20
+# Вес комментария и просмотра в оценке популярности поста
+TRENDING_COMMENT_WEIGHT = 10
+TRENDING_VIEW_WEIGHT = 1
+
+# Бюджет запросов к БД и времени ответа (мс) по имени url
+REQUEST_BUDGETS = {
+    'default': {'queries': 20, 'ms': 500},
+    'index': {'queries': 10, 'ms': 200},
+    'group': {'queries': 10, 'ms': 200},
+    'profile': {'queries': 12, 'ms': 200},
+    'post': {'queries': 12, 'ms': 200},
+    'follow_index': {'queries': 12, 'ms': 200},
+    'trending': {'queries': 10, 'ms': 200},
+}
+
+# Лимиты запросов на запись по имени url: корзины на пользователя и на
+# IP-адрес в виде (число запросов подряд, секунд на полное восполнение)
+THROTTLE_RATES = {
+    'new_post': {'user': (10, 60 * 10), 'ip': (30, 60 * 10)},
+    'add_comment': {'user': (20, 60), 'ip': (60, 60)},
+    'profile_follow': {'user': (30, 60), 'ip': (100, 60),
+                       'methods': ('GET', 'POST')},
+    'signup': {'ip': (5, 60 * 60)},
+}
+# Адреса обратных прокси (nginx), за которыми IP клиента для корзин
+# берётся из заголовка X-Forwarded-For
+THROTTLE_TRUSTED_PROXIES = list(
+    filter(None, os.environ.get('YATUBE_TRUSTED_PROXIES', '').split(',')))
@@ -0,0 +1,28 @@
+"""
+Настройка соединений SQLite для работы под несколькими воркерами.
+
+Прагмы из настройки SQLITE_PRAGMAS выполняются при создании каждого
+соединения. Вместе с CONN_MAX_AGE это происходит один раз на воркер,
+а не на каждый HTTP-запрос.
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+def apply_pragmas(cursor, pragmas):
+    """Выполнение прагм на курсоре DB-API соединения SQLite."""
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@receiver(connection_created)
+def configure_connection(sender, connection, **kwargs):
+    """Прагмы для нового соединения Django с SQLite."""
+    if connection.vendor != 'sqlite':
+        return
+    cursor = connection.connection.cursor()
+    try:
+        apply_pragmas(cursor, settings.SQLITE_PRAGMAS)
+    finally:
+        cursor.close()
@@ -0,0 +1,101 @@
+"""
+Ограничение частоты запросов на запись алгоритмом token bucket.
+
+Корзина на пользователя или IP-адрес вмещает `capacity` жетонов и
+наполняется со скоростью capacity / period жетонов в секунду, каждый
+запрос забирает один жетон. Состояние корзины - пара (жетоны, время)
+в кэше, поэтому проверка стоит одного get_many и одного set_many.
+Корзины настраиваются по имени url в настройке THROTTLE_RATES; по
+умолчанию ограничиваются только POST-запросы, подписка на автора
+выполняется ссылкой, поэтому для неё методы указаны явно.
+
+За обратным прокси REMOTE_ADDR у всех клиентов один, поэтому для
+запросов от адресов из THROTTLE_TRUSTED_PROXIES IP клиента берётся из
+X-Forwarded-For.
+"""
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+BUCKET_KEY = 'throttle:{}:{}:{}'
+KINDS = ('user', 'ip')
+DEFAULT_METHODS = ('POST',)
+
+
+def get_rates(url_name, method):
+    """
+    Корзины url для метода запроса.
+
+    Словарь вид ключа ('user' или 'ip') -> (capacity, period), пустой,
+    если запрос не ограничивается.
+    """
+    config = settings.THROTTLE_RATES.get(url_name)
+    if not config or method not in config.get('methods', DEFAULT_METHODS):
+        return {}
+    return {kind: config[kind] for kind in KINDS if kind in config}
+
+
+def client_ip(request):
+    """
+    IP-адрес клиента.
+
+    X-Forwarded-For учитывается только для запросов от доверенного
+    прокси: адреса в нём просматриваются справа налево, и клиентом
+    считается первый адрес не из списка прокси, ведь левые значения
+    клиент может подставить сам.
+    """
+    address = request.META.get('REMOTE_ADDR', '')
+    trusted = settings.THROTTLE_TRUSTED_PROXIES
+    if address not in trusted:
+        return address
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+    for ip in reversed([ip.strip() for ip in forwarded.split(',')]):
+        if ip and ip not in trusted:
+            return ip
+    return address
+
+
+def client_idents(request, kinds):
+    """Идентификаторы клиента для корзин нужных видов."""
+    idents = {}
+    if 'ip' in kinds:
+        idents['ip'] = client_ip(request)
+    user = getattr(request, 'user', None)
+    if 'user' in kinds and user is not None and user.is_authenticated:
+        idents['user'] = user.pk
+    return idents
+
+
+def take_token(url_name, rates, idents, now=None):
+    """
+    Списание жетона из всех корзин клиента.
+
+    Возвращает 0, если запрос разрешён, иначе число секунд до появления
+    жетона в самой пустой корзине; отклонённый запрос жетонов не тратит.
+    Чтение и запись не атомарны: при гонке параллельных запросов лимит
+    может быть превышен на единицы, что для защиты от перегрузки
+    допустимо.
+    """
+    now = time.time() if now is None else now
+    keys = {kind: BUCKET_KEY.format(url_name, kind, ident)
+            for kind, ident in idents.items()}
+    stored = cache.get_many(keys.values())
+    buckets = {}
+    retry_after = 0
+    longest = 0
+    for kind, key in keys.items():
+        capacity, period = rates[kind]
+        tokens, stamp = stored.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - stamp) * capacity / period)
+        if tokens < 1:
+            retry_after = max(retry_after, math.ceil(
+                (1 - tokens) * period / capacity))
+        buckets[key] = (tokens - 1, now)
+        longest = max(longest, period)
+    if retry_after:
+        return retry_after
+    # Через period корзина снова полна и запись можно не хранить
+    cache.set_many(buckets, longest)
+    return 0
@@ -4,9 +4,10 @@ from django.conf.urls import handler404, handler500
 from django.contrib import admin
 from django.contrib.flatpages import views
 from django.urls import include, path
-from django.views.static import serve
 from django.conf.urls import url
 
+from .serve import serve
+
 handler404 = "posts.views.page_not_found"  # noqa
 handler500 = "posts.views.server_error"  # noqa
 
@@ -41,10 +42,10 @@ if settings.DEBUG:
 
     urlpatterns += (path("__debug__/", include(debug_toolbar.urls)),)
 if not settings.DEBUG:
-    # urlpatterns += static(settings.STATIC_URL,
-    #                       document_root=settings.STATIC_ROOT)
     urlpatterns += [
         url(r'^media/(?P<path>.*)$', serve,
-            {'document_root': settings.MEDIA_ROOT}),
+            {'document_root': settings.MEDIA_ROOT,
+             'internal_prefix': settings.SENDFILE_MEDIA_PREFIX}),
         url(r'^static/(?P<path>.*)$', serve,
-            {'document_root': settings.STATIC_ROOT})]
+            {'document_root': settings.STATIC_ROOT,
+             'internal_prefix': settings.SENDFILE_STATIC_PREFIX})]